@@ -0,0 +1,8 @@
+from django.contrib import admin
+from .models import AuditPartition
+
+
+@admin.register(AuditPartition)
+class AuditPartitionAdmin(admin.ModelAdmin):
+    list_display = ('month', 'table_name', 'created_at', 'archived_at')
+    readonly_fields = ('month', 'table_name', 'created_at', 'archived_at')
@@ -0,0 +1,157 @@
+"""
+Buffered audit event writer
+
+emit() only appends to an in-memory buffer, so requests never wait on the
+audit write. A background thread drains the buffer with one bulk insert per
+monthly partition every AUDIT_FLUSH_INTERVAL seconds, or sooner once
+AUDIT_BATCH_SIZE events are waiting. Events still buffered when a process
+is killed outright are lost; a normal shutdown flushes them.
+"""
+import atexit
+import logging
+import threading
+from collections import defaultdict, deque
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .models import AuditPartition
+from .partitions import ensure_partition, month_of, partition_model
+
+logger = logging.getLogger(__name__)
+
+# Event types
+LOGIN = 'login'
+LOGIN_FAILED = 'login_failed'
+REGISTER = 'register'
+PASSWORD_CHANGE = 'password_change'
+PROFILE_UPDATE = 'profile_update'
+ACCOUNT_DELETE = 'account_delete'
+UPLOAD = 'upload'
+RELAY_ADD = 'relay_add'
+GRANT = 'grant'
+REVOKE = 'revoke'
+
+_buffer = deque()
+_buffer_lock = threading.Lock()
+_wakeup = threading.Event()
+_worker = None
+stats = {'written': 0, 'dropped': 0}
+
+
+def get_client_ip(request):
+    return request.META.get('REMOTE_ADDR') if request is not None else None
+
+
+def emit(event_type, user_id=None, request=None, **data):
+    """Record an audit event without touching the database"""
+    event = {
+        'event_type': event_type,
+        'user_id': user_id,
+        'ip_address': get_client_ip(request),
+        'data': data,
+        'created_at': timezone.now(),
+    }
+    with _buffer_lock:
+        if len(_buffer) >= settings.AUDIT_MAX_BUFFER:
+            # Shed rather than grow without bound if the database falls behind
+            stats['dropped'] += 1
+            return
+        _buffer.append(event)
+        pending = len(_buffer)
+
+    _start_worker()
+    if pending >= settings.AUDIT_BATCH_SIZE:
+        _wakeup.set()
+
+
+def flush():
+    """Write every buffered event; returns the number written"""
+    with _buffer_lock:
+        events = list(_buffer)
+        _buffer.clear()
+    if not events:
+        return 0
+
+    by_month = defaultdict(list)
+    for event in events:
+        by_month[month_of(event['created_at'])].append(event)
+
+    written = 0
+    months = list(by_month)
+    for i, month in enumerate(months):
+        try:
+            model = ensure_partition(month)
+            model.objects.bulk_create(
+                [model(**event) for event in by_month[month]],
+                batch_size=settings.AUDIT_BATCH_SIZE,
+            )
+        except Exception:
+            # Put unwritten events back so the next flush retries them
+            unwritten = [event for m in months[i:] for event in by_month[m]]
+            with _buffer_lock:
+                _buffer.extendleft(reversed(unwritten))
+            raise
+        written += len(by_month[month])
+
+    stats['written'] += written
+    return written
+
+
+def _run():
+    while True:
+        _wakeup.wait(settings.AUDIT_FLUSH_INTERVAL)
+        _wakeup.clear()
+        close_old_connections()
+        try:
+            flush()
+        except Exception:
+            logger.exception("Audit flush failed")
+
+
+def _start_worker():
+    global _worker
+    if _worker is not None:
+        return
+    with _buffer_lock:
+        if _worker is None:
+            _worker = threading.Thread(target=_run, name='audit-flush', daemon=True)
+            _worker.start()
+            atexit.register(_flush_at_exit)
+
+
+def _flush_at_exit():
+    try:
+        flush()
+    except Exception:
+        logger.exception("Audit flush at exit failed")
+
+
+def query(user_id=None, start=None, end=None, event_type=None, limit=100):
+    """
+    Return events newest first, reading only the partitions the range covers
+    Each partition query is served by its (user_id, created_at) or
+    (event_type, created_at) index
+    """
+    partitions = AuditPartition.objects.filter(archived_at__isnull=True)
+    if start:
+        partitions = partitions.filter(month__gte=month_of(start))
+    if end:
+        partitions = partitions.filter(month__lte=month_of(end))
+
+    results = []
+    for partition in partitions.order_by('-month'):
+        queryset = partition_model(partition.month).objects.all()
+        if user_id is not None:
+            queryset = queryset.filter(user_id=user_id)
+        if event_type:
+            queryset = queryset.filter(event_type=event_type)
+        if start:
+            queryset = queryset.filter(created_at__gte=start)
+        if end:
+            queryset = queryset.filter(created_at__lt=end)
+        results.extend(queryset.order_by('-created_at')[:limit - len(results)])
+        if len(results) >= limit:
+            break
+    return results
@@ -0,0 +1,60 @@
+"""
+Export old audit partitions to gzipped JSON Lines, optionally dropping them
+"""
+import gzip
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from audit.models import AuditPartition
+from audit.partitions import drop_partition, partition_model
+
+
+class Command(BaseCommand):
+    help = 'Stream audit partitions older than a month to .jsonl.gz files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--before', required=True, help='Archive partitions before this month (YYYYMM)')
+        parser.add_argument('--output', default=settings.AUDIT_ARCHIVE_DIR, help='Directory to write archives to')
+        parser.add_argument('--drop', action='store_true', help='Drop each partition table after exporting it')
+
+    def handle(self, *args, **options):
+        before = options['before']
+        if len(before) != 6 or not before.isdigit():
+            raise CommandError('--before must be a month in YYYYMM form')
+
+        os.makedirs(options['output'], exist_ok=True)
+        partitions = AuditPartition.objects.filter(month__lt=before, archived_at__isnull=True).order_by('month')
+        for partition in partitions:
+            path = os.path.join(options['output'], f'{partition.table_name}.jsonl.gz')
+            count = self.export(partition, path)
+            self.stdout.write(f'Exported {count} events from {partition.table_name} to {path}')
+
+            if options['drop']:
+                # Marked first so queries stop reading the table before it goes; a crash
+                # in between leaves an unused table rather than a partition without one
+                partition.archived_at = timezone.now()
+                partition.save(update_fields=['archived_at'])
+                drop_partition(partition)
+                self.stdout.write(f'Dropped {partition.table_name}')
+
+    def export(self, partition, path):
+        """Write rows in primary key order, one keyset page at a time"""
+        model = partition_model(partition.month)
+        count = 0
+        last_id = 0
+        tmp_path = f'{path}.tmp'
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            while True:
+                page = list(model.objects.filter(id__gt=last_id).order_by('id')[:settings.AUDIT_EXPORT_CHUNK_SIZE])
+                if not page:
+                    break
+                for event in page:
+                    f.write(json.dumps(event.to_dict()) + '\n')
+                count += len(page)
+                last_id = page[-1].id
+        os.replace(tmp_path, path)
+        return count
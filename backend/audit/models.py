@@ -0,0 +1,44 @@
+from django.db import models
+
+
+class AuditPartition(models.Model):
+    """One month of audit events, stored in its own table"""
+    month = models.CharField(max_length=6, unique=True)  # YYYYMM
+    table_name = models.CharField(max_length=64)
+    created_at = models.DateTimeField(auto_now_add=True)
+    archived_at = models.DateTimeField(null=True, blank=True)  # Set once exported and dropped
+
+    class Meta:
+        db_table = 'audit_partitions'
+        ordering = ['-month']
+
+    def __str__(self):
+        return self.table_name
+
+
+class AuditEventBase(models.Model):
+    """
+    Columns shared by every monthly audit_events_YYYYMM table
+
+    user_id is a plain column rather than a foreign key so the trail
+    outlives the accounts it describes.
+    """
+    id = models.BigAutoField(primary_key=True)
+    event_type = models.CharField(max_length=64)
+    user_id = models.BigIntegerField(null=True, blank=True)
+    ip_address = models.GenericIPAddressField(null=True, blank=True)
+    data = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField()
+
+    class Meta:
+        abstract = True
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'event_type': self.event_type,
+            'user_id': self.user_id,
+            'ip_address': self.ip_address,
+            'data': self.data,
+            'created_at': self.created_at.isoformat(),
+        }
@@ -0,0 +1,76 @@
+"""
+Monthly audit event tables
+
+Each calendar month (UTC) gets its own audit_events_YYYYMM table, created on
+first write and recorded in AuditPartition. Old months can then be exported
+and dropped as a whole instead of deleting rows out of one huge table.
+"""
+import datetime
+import threading
+
+from django.db import DatabaseError, connection, models
+from django.utils import timezone
+
+from .models import AuditEventBase, AuditPartition
+
+_models = {}
+_ready = set()
+_lock = threading.Lock()
+
+
+def month_of(dt):
+    """The YYYYMM partition holding dt, which is keyed by UTC month whatever offset dt carries"""
+    if timezone.is_aware(dt):
+        dt = dt.astimezone(datetime.timezone.utc)
+    return dt.strftime('%Y%m')
+
+
+def partition_model(month):
+    """Return the (unmanaged) model class for a month's table"""
+    with _lock:
+        model = _models.get(month)
+        if model is None:
+            meta = type('Meta', (), {
+                'app_label': 'audit',
+                'db_table': f'audit_events_{month}',
+                'managed': False,
+                'indexes': [
+                    models.Index(fields=['user_id', 'created_at'], name=f'audit_{month}_user_time'),
+                    models.Index(fields=['event_type', 'created_at'], name=f'audit_{month}_type_time'),
+                    models.Index(fields=['created_at'], name=f'audit_{month}_time'),
+                ],
+            })
+            model = type(f'AuditEvent{month}', (AuditEventBase,), {
+                '__module__': 'audit.models',
+                'Meta': meta,
+            })
+            _models[month] = model
+        return model
+
+
+def ensure_partition(month):
+    """Create the month's table if it does not exist yet and return its model"""
+    model = partition_model(month)
+    if month in _ready:
+        return model
+
+    if not AuditPartition.objects.filter(month=month).exists():
+        try:
+            with connection.schema_editor() as editor:
+                editor.create_model(model)
+        except DatabaseError:
+            # Another process created it first
+            if model._meta.db_table not in connection.introspection.table_names():
+                raise
+        AuditPartition.objects.get_or_create(month=month, defaults={'table_name': model._meta.db_table})
+
+    _ready.add(month)
+    return model
+
+
+def drop_partition(partition):
+    """Drop a month's table; its rows should have been exported first"""
+    model = partition_model(partition.month)
+    with connection.schema_editor() as editor:
+        editor.delete_model(model)
+    _ready.discard(partition.month)
@@ -0,0 +1,135 @@
+import datetime
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TransactionTestCase, override_settings
+
+from . import events, partitions
+from .models import AuditPartition
+
+
+def at(value):
+    return datetime.datetime.fromisoformat(value)
+
+
+def drop_partitions():
+    """Partition tables are unmanaged, so the test runner's flush leaves them behind"""
+    tables = connection.introspection.table_names()
+    for partition in AuditPartition.objects.all():
+        if partition.table_name in tables:
+            partitions.drop_partition(partition)
+    partitions._ready.clear()
+
+
+# Partition tables are created with the schema editor, which SQLite does not
+# allow inside the transaction a TestCase wraps each test in
+@mock.patch('audit.events._start_worker')
+class AuditEventTests(TransactionTestCase):
+    def tearDown(self):
+        events._buffer.clear()
+        drop_partitions()
+
+    def record(self, created_at, event_type=events.LOGIN, user_id=1):
+        with mock.patch('audit.events.timezone.now', return_value=at(created_at)):
+            events.emit(event_type, user_id)
+
+    def test_emit_buffers_until_flush(self, start_worker):
+        self.record('2026-10-05T12:00:00+00:00')
+        self.assertEqual(len(events._buffer), 1)
+        self.assertFalse(AuditPartition.objects.exists())
+
+        self.assertEqual(events.flush(), 1)
+        self.assertEqual(len(events._buffer), 0)
+        self.assertEqual(events.query(user_id=1)[0].event_type, events.LOGIN)
+
+    def test_partition_is_created_on_first_write(self, start_worker):
+        self.record('2026-10-05T12:00:00+00:00')
+        events.flush()
+        partition = AuditPartition.objects.get()
+        self.assertEqual(partition.month, '202610')
+        self.assertIn('audit_events_202610', connection.introspection.table_names())
+
+    def test_failed_flush_requeues_unwritten_events(self, start_worker):
+        self.record('2026-10-05T12:00:00+00:00')
+        self.record('2026-11-05T12:00:00+00:00')
+
+        real_ensure = partitions.ensure_partition
+
+        def ensure(month):
+            if month == '202611':
+                raise RuntimeError('database unavailable')
+            return real_ensure(month)
+
+        with mock.patch('audit.events.ensure_partition', side_effect=ensure):
+            with self.assertRaises(RuntimeError):
+                events.flush()
+        # October was written; November waits for the next flush
+        self.assertEqual(len(events._buffer), 1)
+        self.assertEqual(events._buffer[0]['created_at'].month, 11)
+
+        self.assertEqual(events.flush(), 1)
+        self.assertEqual(len(events.query()), 2)
+
+    def test_query_reads_across_partitions_newest_first(self, start_worker):
+        for created_at in ('2026-09-20T00:00:00+00:00', '2026-10-20T00:00:00+00:00', '2026-11-20T00:00:00+00:00'):
+            self.record(created_at)
+        events.flush()
+
+        results = events.query(start=at('2026-10-01T00:00:00+00:00'), end=at('2026-12-01T00:00:00+00:00'))
+        self.assertEqual([event.created_at.month for event in results], [11, 10])
+        self.assertEqual(len(events.query(limit=2)), 2)
+
+    def test_query_bounds_with_an_offset_use_utc_partitions(self, start_worker):
+        self.record('2026-10-31T21:30:00+00:00')
+        events.flush()
+
+        # Nov 1 02:00 at +05:00 is still Oct 31 in UTC
+        results = events.query(start=at('2026-11-01T02:00:00+05:00'), end=at('2026-11-01T03:00:00+05:00'))
+        self.assertEqual(len(results), 1)
+
+
+@mock.patch('audit.events._start_worker')
+class ArchiveAuditTests(TransactionTestCase):
+    def setUp(self):
+        self.output = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.output, ignore_errors=True)
+        with mock.patch('audit.events._start_worker'):
+            for created_at in ('2026-09-20T00:00:00+00:00', '2026-10-20T00:00:00+00:00'):
+                with mock.patch('audit.events.timezone.now', return_value=at(created_at)):
+                    events.emit(events.LOGIN, 1)
+            events.flush()
+
+    def tearDown(self):
+        drop_partitions()
+
+    def archive(self, *args):
+        call_command('archive_audit', '--before', '202610', '--output', self.output, *args, stdout=StringIO())
+
+    @override_settings(AUDIT_EXPORT_CHUNK_SIZE=1)
+    def test_export_keeps_the_partition(self, start_worker):
+        self.archive()
+        with gzip.open(os.path.join(self.output, 'audit_events_202609.jsonl.gz'), 'rt') as f:
+            rows = [json.loads(line) for line in f]
+        self.assertEqual([row['event_type'] for row in rows], [events.LOGIN])
+        self.assertIsNone(AuditPartition.objects.get(month='202609').archived_at)
+        self.assertEqual(len(events.query()), 2)
+
+    def test_drop_archives_then_drops(self, start_worker):
+        self.archive('--drop')
+        self.assertIsNotNone(AuditPartition.objects.get(month='202609').archived_at)
+        self.assertNotIn('audit_events_202609', connection.introspection.table_names())
+        self.assertEqual(len(events.query()), 1)
+
+    def test_failed_drop_leaves_queries_working(self, start_worker):
+        with mock.patch('audit.management.commands.archive_audit.drop_partition', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.archive('--drop')
+        self.assertIsNotNone(AuditPartition.objects.get(month='202609').archived_at)
+        self.assertEqual(len(events.query()), 1)
@@ -0,0 +1,9 @@
+"""
+URL configuration for audit app
+"""
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('', views.list_events, name='list_audit_events'),
+]
@@ -0,0 +1,68 @@
+"""
+Audit API Views
+"""
+import datetime
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+from rest_framework import status
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from authentication.jwt_utils import get_request_payload
+from . import events
+
+
+def _parse_time(value):
+    if not value:
+        return None
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise ValueError(value)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, datetime.timezone.utc)
+    return parsed
+
+
+@api_view(['GET'])
+def list_events(request):
+    """
+    List the current user's audit events, newest first
+
+    Expected header: Authorization: Bearer <token>
+    Query parameters: start, end (ISO 8601), event_type, limit (default 100, max 500)
+    """
+    try:
+        is_valid, payload_or_error = get_request_payload(request)
+        if not is_valid:
+            return Response({
+                'success': False,
+                'error': payload_or_error
+            }, status=status.HTTP_401_UNAUTHORIZED)
+
+        try:
+            start = _parse_time(request.query_params.get('start'))
+            end = _parse_time(request.query_params.get('end'))
+            limit = max(1, min(int(request.query_params.get('limit', 100)), 500))
+        except ValueError:
+            return Response({
+                'success': False,
+                'error': 'start and end must be ISO 8601 datetimes and limit an integer'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        results = events.query(
+            user_id=payload_or_error.get('user_id'),
+            start=start,
+            end=end,
+            event_type=request.query_params.get('event_type'),
+            limit=limit,
+        )
+
+        return Response({
+            'success': True,
+            'events': [event.to_dict() for event in results]
+        }, status=status.HTTP_200_OK)
+
+    except Exception as e:
+        return Response({
+            'success': False,
+            'error': f'Audit query failed: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
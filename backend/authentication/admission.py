@@ -0,0 +1,139 @@
+"""
+Admission control for password-hashing endpoints
+
+Login, registration and password changes spend most of their time in
+PBKDF2. Past a few concurrent hashes per process extra requests only make
+every request slower, so at most ADMISSION_MAX_CONCURRENT of them run at
+once, up to ADMISSION_MAX_QUEUE more wait up to ADMISSION_QUEUE_TIMEOUT
+seconds for a slot, and anything beyond that is shed with a 503 and
+Retry-After. Requests to other paths are never held back.
+"""
+import collections
+import logging
+import threading
+
+from django.conf import settings
+from django.http import JsonResponse
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionController:
+    """
+    A counting semaphore with a bounded FIFO wait queue and counters for metrics
+
+    Each waiter parks on its own event and release() hands the freed slot
+    straight to the oldest one, so requests are admitted in arrival order
+    and a new arrival never takes a slot ahead of a request already queued.
+    """
+
+    def __init__(self, max_concurrent, max_queue, timeout):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._waiters = collections.deque()
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.admitted = 0
+        self.shed = 0
+
+    @property
+    def queued(self):
+        return len(self._waiters)
+
+    def acquire(self):
+        """Take a slot, waiting in the queue if there is room; returns False if shed"""
+        with self._lock:
+            if self.in_flight < self.max_concurrent and not self._waiters:
+                self.in_flight += 1
+                self.admitted += 1
+                return True
+            if len(self._waiters) >= self.max_queue:
+                self.shed += 1
+                return False
+            waiter = threading.Event()
+            self._waiters.append(waiter)
+
+        waiter.wait(self.timeout)
+        with self._lock:
+            # Checked under the lock: release() may have handed over the slot
+            # just as the wait timed out
+            if not waiter.is_set():
+                self._waiters.remove(waiter)
+                self.shed += 1
+                return False
+            self.admitted += 1
+        return True
+
+    def release(self):
+        with self._lock:
+            if self._waiters:
+                # The slot passes to the oldest waiter, so in_flight is unchanged
+                self._waiters.popleft().set()
+            else:
+                self.in_flight -= 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'in_flight': self.in_flight,
+                'queue_depth': self.queued,
+                'admitted': self.admitted,
+                'shed': self.shed,
+                'max_concurrent': self.max_concurrent,
+                'max_queue': self.max_queue,
+            }
+
+
+_controller = None
+_controller_lock = threading.Lock()
+
+
+def get_controller():
+    global _controller
+    if _controller is None:
+        with _controller_lock:
+            if _controller is None:
+                _controller = AdmissionController(
+                    settings.ADMISSION_MAX_CONCURRENT,
+                    settings.ADMISSION_MAX_QUEUE,
+                    settings.ADMISSION_QUEUE_TIMEOUT,
+                )
+    return _controller
+
+
+class AdmissionControlMiddleware:
+    """Cap concurrent POSTs to the paths in ADMISSION_CONTROLLED_PATHS"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.paths = tuple(settings.ADMISSION_CONTROLLED_PATHS)
+
+    def __call__(self, request):
+        if request.method != 'POST' or not request.path.startswith(self.paths):
+            return self.get_response(request)
+
+        controller = get_controller()
+        if not controller.acquire():
+            logger.warning("Shedding %s: %s", request.path, controller.stats())
+            response = JsonResponse({
+                'success': False,
+                'error': 'Server is busy, please retry shortly'
+            }, status=503)
+            response['Retry-After'] = str(settings.ADMISSION_RETRY_AFTER)
+            return response
+
+        released = False
+
+        def release_admission():
+            # Lets a view hand its slot back early, e.g. while it only waits on another request
+            nonlocal released
+            if not released:
+                released = True
+                controller.release()
+
+        request.release_admission = release_admission
+        try:
+            return self.get_response(request)
+        finally:
+            release_admission()
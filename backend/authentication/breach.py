@@ -0,0 +1,107 @@
+"""
+Breached-password check against an on-disk Bloom filter
+
+The filter is built once from a list of SHA-1 password hashes (the format
+Have I Been Pwned publishes) by the build_breach_filter command. Every
+worker memory-maps the same file read-only, so the operating system keeps a
+single copy in the page cache however many processes use it. A lookup
+hashes the password with SHA-1 and reads k bits. False positives occur at
+the rate the filter was built for; false negatives never occur.
+
+File layout: a 32-byte header (magic, bit count, entry count, hash count)
+followed by the bit array.
+"""
+import hashlib
+import math
+import mmap
+import os
+import struct
+import threading
+
+from django.conf import settings
+
+MAGIC = b'BSBLOOM1'
+HEADER = struct.Struct('<8sQQI4x')
+
+
+def bloom_parameters(entries, false_positive_rate):
+    """Return (bits, hashes) sized for entries at the given false positive rate"""
+    entries = max(entries, 1)
+    bits = math.ceil(-entries * math.log(false_positive_rate) / math.log(2) ** 2)
+    bits = (bits + 7) // 8 * 8
+    hashes = max(1, round(bits / entries * math.log(2)))
+    return bits, hashes
+
+
+def bit_positions(digest, bits, hashes):
+    """Double hashing over the two halves of a SHA-1 digest, which is already uniform"""
+    h1 = int.from_bytes(digest[:8], 'little')
+    h2 = int.from_bytes(digest[8:16], 'little') | 1
+    return [(h1 + i * h2) % bits for i in range(hashes)]
+
+
+class BloomFilter:
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.bits, self.entries, self.hashes = HEADER.unpack_from(self._map)
+        if magic != MAGIC or len(self._map) < HEADER.size + self.bits // 8:
+            self._map.close()
+            raise ValueError(f'{path} is not a breached-password filter')
+
+    def contains_digest(self, digest):
+        data = self._map
+        for position in bit_positions(digest, self.bits, self.hashes):
+            if not data[HEADER.size + (position >> 3)] & (1 << (position & 7)):
+                return False
+        return True
+
+    def __contains__(self, password):
+        return self.contains_digest(hashlib.sha1(password.encode('utf-8')).digest())
+
+    def close(self):
+        self._map.close()
+
+
+_filter = None
+_filter_key = None
+_lock = threading.Lock()
+
+
+def get_filter():
+    """
+    Return the filter at BREACHED_PASSWORD_FILTER, or None if none is configured
+    A rebuilt file is picked up on the next call
+    """
+    global _filter, _filter_key
+    path = settings.BREACHED_PASSWORD_FILTER
+    if not path:
+        return None
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+
+    key = (path, stat.st_ino, stat.st_mtime_ns)
+    if key != _filter_key:
+        with _lock:
+            if key != _filter_key:
+                previous = _filter
+                _filter = BloomFilter(path)
+                _filter_key = key
+                if previous is not None:
+                    # Unmaps the old file; a lookup still using it retries (see is_breached)
+                    previous.close()
+    return _filter
+
+
+def is_breached(password):
+    while True:
+        breach_filter = get_filter()
+        if breach_filter is None:
+            return False
+        try:
+            return password in breach_filter
+        except ValueError:
+            # The filter was closed by a rebuild mid-lookup; get_filter() now returns the new one
+            continue
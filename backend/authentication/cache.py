@@ -0,0 +1,48 @@
+"""
+Per-user profile cache for GET /api/me
+
+Entries are dropped by post_save and post_delete receivers (see signals.py),
+which also fire for queryset deletes such as the admin's delete selected.
+QuerySet.update() bypasses them. With more than one server process,
+configure a shared CACHES backend so the invalidation reaches every process;
+otherwise entries are only bounded by PROFILE_CACHE_TIMEOUT.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+
+def profile_cache_key(user_id):
+    return f'user_profile:{user_id}'
+
+
+def build_profile(user):
+    return {
+        'userId': user.id,
+        'username': user.username,
+        'email': user.email,
+        'created_at': user.created_at.isoformat(),
+        'updated_at': user.updated_at.isoformat(),
+        'etag': f'"{user.id}-{int(user.updated_at.timestamp() * 1000000)}"',
+    }
+
+
+def get_profile(user_id):
+    """
+    Return the cached profile for an active user, loading it on a miss
+    Returns None if the user does not exist or is inactive
+    """
+    key = profile_cache_key(user_id)
+    profile = cache.get(key)
+    if profile is None:
+        from .models import User
+
+        user = User.objects.filter(id=user_id, is_active=True).first()
+        if user is None:
+            return None
+        profile = build_profile(user)
+        cache.set(key, profile, settings.PROFILE_CACHE_TIMEOUT)
+    return profile
+
+
+def invalidate_profile(user_id):
+    cache.delete(profile_cache_key(user_id))
@@ -0,0 +1,158 @@
+"""
+Idempotency-Key support for POST endpoints
+
+The first request with a given key runs normally and its response is
+stored until IDEMPOTENCY_TTL. Retries with the same key and payload get the
+stored response back without re-running the view; a retry that arrives
+while the first request is still running waits for it to finish, after
+handing its admission slot back (see admission.py) since it hashes nothing.
+Expired records are deleted by a recurring background job.
+
+Keys are scoped per user on authenticated requests. Anonymous requests are
+scoped by their fingerprint as well, so two people registering with the
+same key never see each other's response; a changed payload there simply
+counts as a new request. Fingerprints are HMACs keyed with SECRET_KEY, so
+stored records reveal nothing about the passwords in the payload, and JWTs
+are not stored: a replayed response gets a freshly issued token.
+"""
+import datetime
+import functools
+import hashlib
+import hmac
+import json
+import time
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .jwt_utils import generate_token, get_request_payload
+from .models import IdempotencyRecord, User
+
+POLL_INTERVAL = 0.05
+
+
+def _fingerprint(request):
+    payload = json.dumps(request.data, sort_keys=True, default=str)
+    message = f'{request.method} {request.path} {payload}'.encode('utf-8')
+    return hmac.new(settings.SECRET_KEY.encode('utf-8'), message, hashlib.sha256).hexdigest()
+
+
+def _scope(request, fingerprint):
+    is_valid, payload_or_error = get_request_payload(request)
+    if is_valid:
+        return str(payload_or_error.get('user_id'))
+    return f'anon:{fingerprint[:32]}'
+
+
+def _stored_body(data):
+    """The response body to keep, without the JWT"""
+    if isinstance(data, dict) and 'token' in data:
+        return {**data, 'token': None}
+    return data
+
+
+def _replayed_body(body):
+    """Issue a new JWT for a replayed response that carried one"""
+    if isinstance(body, dict) and 'token' in body and body.get('userId'):
+        user = User.objects.filter(id=body['userId'], is_active=True).first()
+        body = {**body, 'token': generate_token(user.id, user.email) if user else None}
+    return body
+
+
+def _claim(key, scope, fingerprint):
+    """
+    Create the record for a key, or return the existing one
+    Returns: (record, created)
+    """
+    now = timezone.now()
+    IdempotencyRecord.objects.filter(key=key, scope=scope, expires_at__lt=now).delete()
+    try:
+        with transaction.atomic():
+            record = IdempotencyRecord.objects.create(
+                key=key, scope=scope, fingerprint=fingerprint,
+                expires_at=now + datetime.timedelta(seconds=settings.IDEMPOTENCY_LOCK_TIMEOUT),
+            )
+            return record, True
+    except IntegrityError:
+        return IdempotencyRecord.objects.filter(key=key, scope=scope).first(), False
+
+
+def _wait_for(record):
+    """Wait for the original request to finish; returns None if it does not in time"""
+    deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_TIMEOUT
+    while not record.completed:
+        if time.monotonic() > deadline:
+            return None
+        time.sleep(POLL_INTERVAL)
+        record = IdempotencyRecord.objects.filter(id=record.id).first()
+        if record is None:
+            # The original request failed and released the key
+            return None
+    return record
+
+
+def _error(message, status_code):
+    return Response({
+        'success': False,
+        'error': message
+    }, status=status_code)
+
+
+def idempotent(view):
+    """Replay stored responses for repeated Idempotency-Key headers"""
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+        if not key:
+            return view(request, *args, **kwargs)
+        if len(key) > 255:
+            return _error('Idempotency-Key must be at most 255 characters', status.HTTP_400_BAD_REQUEST)
+
+        fingerprint = _fingerprint(request)
+        record, created = _claim(key, _scope(request, fingerprint), fingerprint)
+
+        if not created:
+            # A replay or a wait hashes no password, so give the admission slot to another request
+            release_admission = getattr(request, 'release_admission', None)
+            if release_admission is not None:
+                release_admission()
+            if record is None:
+                return _error('Idempotency-Key is being reused, retry the request', status.HTTP_409_CONFLICT)
+            if record.fingerprint != fingerprint:
+                return _error('Idempotency-Key was already used for a different request',
+                              status.HTTP_422_UNPROCESSABLE_ENTITY)
+            record = _wait_for(record)
+            if record is None:
+                return _error('A request with this Idempotency-Key is still in progress',
+                              status.HTTP_409_CONFLICT)
+            response = Response(_replayed_body(record.response_body), status=record.response_status)
+            response['Idempotent-Replayed'] = 'true'
+            return response
+
+        from .tasks import schedule_idempotency_purge  # tasks imports this module
+        schedule_idempotency_purge()
+        try:
+            response = view(request, *args, **kwargs)
+        except Exception:
+            record.delete()
+            raise
+
+        if response.status_code >= 500:
+            # Server errors are not final; let a retry run the request again
+            record.delete()
+        else:
+            record.completed = True
+            record.response_status = response.status_code
+            record.response_body = _stored_body(response.data)
+            record.expires_at = timezone.now() + datetime.timedelta(seconds=settings.IDEMPOTENCY_TTL)
+            record.save(update_fields=['completed', 'response_status', 'response_body', 'expires_at'])
+        return response
+
+    return wrapper
+
+
+def purge_expired():
+    return IdempotencyRecord.objects.filter(expires_at__lt=timezone.now()).delete()[0]
@@ -65,3 +65,15 @@ def decode_token(token):
     except Exception as e:
         raise Exception(str(e))
 
+
+def get_request_payload(request):
+    """
+    Verify the Bearer token carried in a request's Authorization header
+    Returns: (is_valid, payload_or_error)
+    """
+    auth_header = request.headers.get('Authorization', '')
+    if not auth_header.startswith('Bearer '):
+        return False, "Invalid authorization header"
+
+    token = auth_header.split(' ')[1]
+    return verify_token(token)
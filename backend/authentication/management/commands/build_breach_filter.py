@@ -0,0 +1,72 @@
+"""
+Build the breached-password Bloom filter from a list of SHA-1 hashes
+"""
+import gzip
+import mmap
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from authentication.breach import HEADER, MAGIC, bit_positions, bloom_parameters
+
+
+def _open(path):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8', errors='replace')
+    return open(path, encoding='utf-8', errors='replace')
+
+
+class Command(BaseCommand):
+    help = 'Build the breached-password filter from a file of SHA-1 hashes, one per line (HASH or HASH:COUNT)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('hash_file', help='Input file, optionally gzipped')
+        parser.add_argument('--output', default=settings.BREACHED_PASSWORD_FILTER,
+                            help='Filter file to write (default: BREACHED_PASSWORD_FILTER)')
+        parser.add_argument('--false-positive-rate', type=float, default=0.001)
+        parser.add_argument('--entries', type=int,
+                            help='Number of hashes in the input; counted with an extra pass if omitted')
+
+    def handle(self, *args, **options):
+        output = options['output']
+        if not output:
+            raise CommandError('Set BREACHED_PASSWORD_FILTER or pass --output')
+        if not 0 < options['false_positive_rate'] < 1:
+            raise CommandError('--false-positive-rate must be between 0 and 1')
+
+        entries = options['entries']
+        if entries is None:
+            with _open(options['hash_file']) as f:
+                entries = sum(1 for line in f if line.strip())
+
+        bits, hashes = bloom_parameters(entries, options['false_positive_rate'])
+        self.stdout.write(f'Sizing for {entries} hashes: {bits // 8} bytes, {hashes} hash functions')
+
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        tmp_path = f'{output}.tmp'
+        added = skipped = 0
+        with open(tmp_path, 'w+b') as out:
+            out.truncate(HEADER.size + bits // 8)
+            # Set bits through a map of the output so memory use does not grow with the filter
+            with mmap.mmap(out.fileno(), 0) as data:
+                with _open(options['hash_file']) as f:
+                    for line in f:
+                        try:
+                            digest = bytes.fromhex(line.strip().split(':', 1)[0])
+                        except ValueError:
+                            digest = b''
+                        if len(digest) != 20:
+                            skipped += line.strip() != ''
+                            continue
+                        for position in bit_positions(digest, bits, hashes):
+                            data[HEADER.size + (position >> 3)] |= 1 << (position & 7)
+                        added += 1
+                HEADER.pack_into(data, 0, MAGIC, bits, added, hashes)
+                data.flush()
+        os.replace(tmp_path, output)
+
+        if added > entries:
+            self.stderr.write(f'Input had {added} hashes, more than the {entries} sized for; '
+                              f'the false positive rate will be higher')
+        self.stdout.write(f'Wrote {output} with {added} hashes ({skipped} unreadable lines skipped)')
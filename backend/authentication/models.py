@@ -2,6 +2,7 @@ from django.db import models
 from django.contrib.auth.hashers import make_password, check_password
 from django.core.validators import EmailValidator
 import re
+from .breach import is_breached
 
 
 class User(models.Model):
@@ -46,6 +47,9 @@ class User(models.Model):
         
         if not re.search(r'\d', password):
             return False, "Password must contain at least one number"
+
+        if is_breached(password):
+            return False, "This password has appeared in a data breach, please choose a different one"
         
         return True, None
 
@@ -84,3 +88,24 @@ class User(models.Model):
             self.set_password(self.password)
         super().save(*args, **kwargs)
 
+
+
+class IdempotencyRecord(models.Model):
+    """The stored outcome of a POST made with an Idempotency-Key header"""
+    key = models.CharField(max_length=255)
+    scope = models.CharField(max_length=64, blank=True)  # User id, or anon: and a fingerprint prefix
+    fingerprint = models.CharField(max_length=64)  # HMAC of method, path and payload
+    completed = models.BooleanField(default=False)
+    response_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        db_table = 'idempotency_keys'
+        constraints = [
+            models.UniqueConstraint(fields=['key', 'scope'], name='unique_idempotency_key'),
+        ]
+
+    def __str__(self):
+        return f'{self.scope}:{self.key}'
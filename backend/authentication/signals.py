@@ -0,0 +1,15 @@
+"""
+Signal handlers for the authentication app
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import invalidate_profile
+from .models import User
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def drop_cached_profile(sender, instance, **kwargs):
+    """Queryset deletes, such as the admin's delete selected, send post_delete too"""
+    invalidate_profile(instance.id)
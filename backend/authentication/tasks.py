@@ -0,0 +1,57 @@
+"""
+Background jobs for the authentication app
+"""
+from django.conf import settings
+from django.db import models, transaction
+
+from jobs.queue import enqueue, task
+from .idempotency import purge_expired
+from .models import IdempotencyRecord, User
+
+DELETE_USER = 'authentication.delete_user'
+PURGE_IDEMPOTENCY = 'authentication.purge_idempotency'
+
+
+@task(DELETE_USER)
+def delete_user(user_id):
+    """
+    Delete a deactivated account and everything that references it
+    Rows are deleted in batches of JOB_DELETE_BATCH_SIZE, each in its own
+    transaction, so no lock is held for the whole cascade
+    """
+    user = User.objects.filter(id=user_id, is_active=False).first()
+    if user is None:
+        return
+
+    for relation in User._meta.related_objects:
+        model = relation.related_model
+        field = relation.field.name
+        queryset = model._base_manager.filter(**{field: user}).order_by('pk')
+        while True:
+            ids = list(queryset.values_list('pk', flat=True)[:settings.JOB_DELETE_BATCH_SIZE])
+            if not ids:
+                break
+            with transaction.atomic():
+                if relation.on_delete is models.SET_NULL:
+                    # Rows that outlive the account, such as the on-chain record of relayed adds
+                    model._base_manager.filter(pk__in=ids).update(**{field: None})
+                else:
+                    # Deleting through the queryset still sends post_delete, which releases stored
+                    # files and removes partial uploads; content leaves storage only after this
+                    # batch commits
+                    model._base_manager.filter(pk__in=ids).delete()
+
+    user.delete()
+
+
+def schedule_idempotency_purge():
+    """Queue a sweep for expired Idempotency-Key records, unless one is already queued"""
+    enqueue(PURGE_IDEMPOTENCY, delay=settings.IDEMPOTENCY_PURGE_INTERVAL, unique_key=PURGE_IDEMPOTENCY)
+
+
+@task(PURGE_IDEMPOTENCY)
+def purge_idempotency():
+    purge_expired()
+    # Sweep again later while any keys remain
+    if IdempotencyRecord.objects.exists():
+        schedule_idempotency_purge()
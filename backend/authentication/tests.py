@@ -1,4 +1,319 @@
-from django.test import TestCase
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User as StaffUser
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import AsyncClient, Client, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
 
+from files import dedup, uploads
+from files.models import PendingAdd, StoredFile
+from jobs.models import Job
+from . import breach
+from .admission import AdmissionController
+from .cache import profile_cache_key
+from .jwt_utils import generate_token, verify_token
+from .models import IdempotencyRecord, User
+from .tasks import PURGE_IDEMPOTENCY, delete_user, purge_idempotency
+
+
+class ExportUsersTests(TestCase):
+    def setUp(self):
+        for n in range(3):
+            User.objects.create(username=f'user{n}', email=f'user{n}@example.com', password='x')
+        self.staff = StaffUser.objects.create_user('admin', password='x', is_staff=True)
+
+    def test_wsgi_export_streams(self):
+        client = Client()
+        client.force_login(self.staff)
+        response = client.get('/api/users/export/', {'format': 'jsonl', 'fields': 'id,email'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertFalse(response.is_async)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 3)
+
+    def test_asgi_export_streams_without_buffering(self):
+        client = AsyncClient()
+        client.force_login(self.staff)
+
+        async def fetch():
+            response = await client.get('/api/users/export/', {'fields': 'id,email'})
+            body = b''.join([part async for part in response.streaming_content])
+            return response, body
+
+        response, body = async_to_sync(fetch)()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+        self.assertEqual(len(body.decode().splitlines()), 4)  # Header and three rows
+
+
+@mock.patch('audit.events.emit')
+class IdempotencyTests(TestCase):
+    def register(self, username, key='k1'):
+        return APIClient().post('/api/register/', {
+            'username': username,
+            'email': f'{username}@example.com',
+            'password': 'Tr1cky-Passw0rd',
+        }, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_anonymous_keys_do_not_collide(self, emit):
+        first = self.register('alice')
+        second = self.register('bob')
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(second.status_code, 201)
+        self.assertNotEqual(first.data['userId'], second.data['userId'])
+
+    def test_replay_issues_a_new_token_and_stores_none(self, emit):
+        first = self.register('alice')
+        replay = self.register('alice')
+        self.assertEqual(replay.status_code, 201)
+        self.assertEqual(replay['Idempotent-Replayed'], 'true')
+        self.assertEqual(replay.data['userId'], first.data['userId'])
+        self.assertTrue(verify_token(replay.data['token'])[0])
+        self.assertEqual(User.objects.filter(username='alice').count(), 1)
+
+        record = IdempotencyRecord.objects.get()
+        self.assertIsNone(record.response_body['token'])
+        self.assertNotIn(first.data['token'], str(record.response_body))
+
+    def simulate_in_flight(self):
+        """Turn the stored outcome of a first request back into one still running"""
+        record = IdempotencyRecord.objects.get()
+        stored = (record.response_status, record.response_body)
+        IdempotencyRecord.objects.filter(id=record.id).update(
+            completed=False, response_status=None, response_body=None,
+        )
+        return record, stored
+
+    def test_concurrent_duplicate_waits_for_the_first_request(self, emit):
+        self.register('alice')
+        record, (response_status, response_body) = self.simulate_in_flight()
+        controller = AdmissionController(max_concurrent=1, max_queue=0, timeout=0.1)
+        in_flight = []
+
+        def first_request_finishes(seconds):
+            # The waiting duplicate has handed back its admission slot
+            in_flight.append(controller.stats()['in_flight'])
+            IdempotencyRecord.objects.filter(id=record.id).update(
+                completed=True, response_status=response_status, response_body=response_body,
+            )
+
+        with mock.patch('authentication.admission.get_controller', return_value=controller), \
+                mock.patch('authentication.idempotency.time.sleep', side_effect=first_request_finishes):
+            replay = self.register('alice')
+
+        self.assertEqual(replay.status_code, 201)
+        self.assertEqual(replay['Idempotent-Replayed'], 'true')
+        self.assertEqual(in_flight, [0])
+        self.assertEqual(controller.stats()['in_flight'], 0)
+        self.assertEqual(User.objects.filter(username='alice').count(), 1)
+
+    @override_settings(IDEMPOTENCY_WAIT_TIMEOUT=0.1)
+    def test_duplicate_gives_up_if_the_first_request_does_not_finish(self, emit):
+        self.register('alice')
+        self.simulate_in_flight()
+        self.assertEqual(self.register('alice').status_code, 409)
+
+    def test_expired_keys_are_purged_by_a_recurring_job(self, emit):
+        self.register('alice')
+        self.assertTrue(Job.objects.filter(name=PURGE_IDEMPOTENCY, status=Job.STATUS_QUEUED).exists())
+        self.register('bob', key='k2')
+        self.assertEqual(Job.objects.filter(name=PURGE_IDEMPOTENCY).count(), 1)
+
+        IdempotencyRecord.objects.filter(key='k1').update(expires_at=timezone.now())
+        Job.objects.all().delete()
+        purge_idempotency()
+        self.assertEqual(list(IdempotencyRecord.objects.values_list('key', flat=True)), ['k2'])
+        # Keys remain, so the sweep is queued again
+        self.assertTrue(Job.objects.filter(name=PURGE_IDEMPOTENCY, status=Job.STATUS_QUEUED).exists())
+
+    def test_fingerprint_is_keyed(self, emit):
+        self.register('alice')
+        record = IdempotencyRecord.objects.get()
+        payload = '{"email": "alice@example.com", "password": "Tr1cky-Passw0rd", "username": "alice"}'
+        plain = hashlib.sha256(f'POST /api/register/ {payload}'.encode('utf-8')).hexdigest()
+        self.assertNotEqual(record.fingerprint, plain)
+        self.assertTrue(record.scope.startswith('anon:'))
+
+
+class AdmissionControllerTests(TestCase):
+    def test_waiters_are_admitted_before_new_arrivals(self):
+        controller = AdmissionController(max_concurrent=1, max_queue=5, timeout=0.5)
+        self.assertTrue(controller.acquire())
+
+        results = []
+        waiter = threading.Thread(target=lambda: results.append(controller.acquire()))
+        waiter.start()
+        while controller.queued == 0:
+            time.sleep(0.01)
+
+        controller.release()
+        # The freed slot belongs to the queued request, so this one waits and times out
+        self.assertFalse(controller.acquire())
+        waiter.join()
+        self.assertEqual(results, [True])
+
+        controller.release()
+        self.assertEqual(controller.stats()['in_flight'], 0)
+        self.assertTrue(controller.acquire())
+
+    def test_full_queue_is_shed(self):
+        controller = AdmissionController(max_concurrent=1, max_queue=0, timeout=0.5)
+        self.assertTrue(controller.acquire())
+        self.assertFalse(controller.acquire())
+        self.assertEqual(controller.stats()['shed'], 1)
+
+
+@mock.patch('files.dedup.get_storage')
+class DeleteUserTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='alice', email='alice@example.com', password='x', is_active=False)
+        dedup.add_owner(dedup.register('a' * 64, 'b' * 64, 3, 'bafycontent'), self.user, 'a.png')
+
+    def test_stored_content_is_deleted_after_commit(self, get_storage):
+        with self.captureOnCommitCallbacks(execute=True):
+            delete_user(self.user.id)
+            get_storage.return_value.delete.assert_not_called()
+
+        self.assertFalse(User.objects.exists())
+        self.assertFalse(StoredFile.objects.exists())
+        get_storage.return_value.delete.assert_called_once_with('bafycontent')
+
+    def test_content_recorded_on_chain_is_kept(self, get_storage):
+        PendingAdd.objects.create(user=self.user, owner='0x' + 'a' * 40, uri='ipfs://bafycontent',
+                                  status=PendingAdd.STATUS_CONFIRMED)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            delete_user(self.user.id)
+
+        self.assertFalse(User.objects.exists())
+        self.assertEqual(StoredFile.objects.get().ref_count, 0)
+        self.assertIsNone(PendingAdd.objects.get().user)
+        get_storage.return_value.delete.assert_not_called()
+
+    def test_partial_uploads_are_removed(self, get_storage):
+        with tempfile.TemporaryDirectory() as temp_dir, override_settings(UPLOAD_TEMP_DIR=temp_dir):
+            session = uploads.create_session(self.user, 'big.bin', 1024)
+            self.assertTrue(os.path.exists(uploads.partial_path(session)))
+
+            delete_user(self.user.id)
+            self.assertFalse(os.path.exists(uploads.partial_path(session)))
+
+
+@mock.patch('audit.events.emit')
+class ProfileTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User(username='alice', email='alice@example.com', password='Passw0rd')
+        self.user.save()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + generate_token(self.user.id, self.user.email))
+
+    def test_unchanged_profile_is_not_modified(self, emit):
+        response = self.client.get('/api/me/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['username'], 'alice')
+
+        response = self.client.get('/api/me/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_update_changes_the_etag(self, emit):
+        etag = self.client.get('/api/me/')['ETag']
+        response = self.client.post('/api/update-profile/', {
+            'username': 'alice2', 'email': 'alice@example.com',
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.get('/api/me/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['username'], 'alice2')
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_deactivated_account_is_not_found(self, emit):
+        self.client.get('/api/me/')
+        response = self.client.post('/api/delete-account/', {'password': 'Passw0rd'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get('/api/me/').status_code, 404)
+
+    def test_queryset_delete_drops_the_cached_profile(self, emit):
+        self.client.get('/api/me/')
+        self.assertIsNotNone(cache.get(profile_cache_key(self.user.id)))
+
+        User.objects.filter(id=self.user.id).delete()
+        self.assertIsNone(cache.get(profile_cache_key(self.user.id)))
+        self.assertEqual(self.client.get('/api/me/').status_code, 404)
+
+
+class BreachFilterTests(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, ignore_errors=True)
+        self.path = os.path.join(self.temp_dir, 'breached.bloom')
+        override = override_settings(BREACHED_PASSWORD_FILTER=self.path)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.addCleanup(self.reset_filter)
+
+    def reset_filter(self):
+        if breach._filter is not None:
+            breach._filter.close()
+        breach._filter = breach._filter_key = None
+
+    def build(self, *lines):
+        hash_file = os.path.join(self.temp_dir, 'hashes.txt')
+        with open(hash_file, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        out = StringIO()
+        call_command('build_breach_filter', hash_file, '--output', self.path, stdout=out)
+        return out.getvalue()
+
+    @staticmethod
+    def sha1(password):
+        return hashlib.sha1(password.encode('utf-8')).hexdigest().upper()
+
+    def test_bloom_parameters(self):
+        bits, hashes = breach.bloom_parameters(1000, 0.001)
+        self.assertEqual(bits % 8, 0)
+        self.assertGreaterEqual(bits, 14378)  # -n ln p / (ln 2)^2
+        self.assertEqual(hashes, 10)
+        self.assertEqual(breach.bloom_parameters(0, 0.01), breach.bloom_parameters(1, 0.01))
+
+    def test_built_filter_finds_listed_passwords(self):
+        output = self.build(f'{self.sha1("hunter2")}:42', self.sha1('letmein'))
+        bloom = breach.BloomFilter(self.path)
+        self.addCleanup(bloom.close)
+        self.assertEqual(bloom.entries, 2)
+        self.assertIn('hunter2', bloom)
+        self.assertIn('letmein', bloom)
+        self.assertNotIn('a much longer passphrase nobody uses', bloom)
+        self.assertIn('2 hashes (0 unreadable lines skipped)', output)
+
+    def test_malformed_lines_are_skipped(self):
+        output = self.build('not-a-hash', 'ABCDEF:1', '', self.sha1('hunter2'))
+        self.assertIn('1 hashes (2 unreadable lines skipped)', output)
+        self.assertTrue(breach.is_breached('hunter2'))
+
+    def test_rebuilt_file_is_reloaded_and_the_old_map_closed(self):
+        self.build(self.sha1('hunter2'))
+        first = breach.get_filter()
+        self.assertFalse(breach.is_breached('letmein'))
+
+        self.build(self.sha1('letmein'))
+        second = breach.get_filter()
+        self.assertIsNot(second, first)
+        self.assertTrue(first._map.closed)
+        self.assertTrue(breach.is_breached('letmein'))
+
+    def test_no_filter_configured(self):
+        with override_settings(BREACHED_PASSWORD_FILTER=''):
+            self.assertFalse(breach.is_breached('hunter2'))
@@ -8,8 +8,11 @@ urlpatterns = [
     path('register/', views.register, name='register'),
     path('login/', views.login, name='login'),
     path('verify-token/', views.verify_token_view, name='verify_token'),
+    path('metrics/admission/', views.admission_metrics, name='admission_metrics'),
+    path('me/', views.me, name='me'),
     path('change-password/', views.change_password, name='change_password'),
     path('update-profile/', views.update_profile, name='update_profile'),
     path('delete-account/', views.delete_account, name='delete_account'),
+    path('users/export/', views.export_users, name='export_users'),
 ]
 
@@ -4,13 +4,24 @@ Authentication API Views
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
-from django.db import IntegrityError
+from django.db import IntegrityError, transaction
+from django.http import JsonResponse, StreamingHttpResponse
 from django.utils import timezone
+from django.views.decorators.http import require_GET
+from audit import events as audit
+from blockshare import streaming
+from jobs.queue import enqueue
 from .models import User
-from .jwt_utils import generate_token
+from .jwt_utils import generate_token, get_request_payload
+from .cache import get_profile
+from .idempotency import idempotent
+from .admission import get_controller
+from . import export
+from .tasks import DELETE_USER
 
 
 @api_view(['POST'])
+@idempotent
 def register(request):
     """
     Register a new user
@@ -79,6 +90,7 @@ def register(request):
             password=password  # Will be hashed in model's save method
         )
         user.save()
+        audit.emit(audit.REGISTER, user.id, request, username=user.username)
 
         # Generate JWT token
         token = generate_token(user.id, user.email)
@@ -105,6 +117,7 @@ def register(request):
 
 
 @api_view(['POST'])
+@idempotent
 def login(request):
     """
     Login user
@@ -139,6 +152,7 @@ def login(request):
         try:
             user = User.objects.get(email=email)
         except User.DoesNotExist:
+            audit.emit(audit.LOGIN_FAILED, None, request, email=email, reason='unknown_email')
             return Response({
                 'success': False,
                 'error': 'Invalid email or password'
@@ -146,6 +160,7 @@ def login(request):
 
         # Check if user is active
         if not user.is_active:
+            audit.emit(audit.LOGIN_FAILED, user.id, request, reason='disabled')
             return Response({
                 'success': False,
                 'error': 'Account is disabled'
@@ -153,6 +168,7 @@ def login(request):
 
         # Verify password
         if not user.check_password(password):
+            audit.emit(audit.LOGIN_FAILED, user.id, request, reason='bad_password')
             return Response({
                 'success': False,
                 'error': 'Invalid email or password'
@@ -161,6 +177,7 @@ def login(request):
         # Update last login
         user.last_login = timezone.now()
         user.save(update_fields=['last_login'])
+        audit.emit(audit.LOGIN, user.id, request)
 
         # Generate JWT token
         token = generate_token(user.id, user.email)
@@ -220,7 +237,70 @@ def verify_token_view(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@api_view(['GET'])
+def admission_metrics(request):
+    """
+    Report this process's admission control counters
+    queue_depth and in_flight are current values; admitted and shed count
+    since the process started
+    """
+    return Response({
+        'success': True,
+        'admission': get_controller().stats()
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+def me(request):
+    """
+    Get the current user's profile
+
+    Served from a per-user cache; send the returned ETag back in
+    If-None-Match to get 304 Not Modified while the profile is unchanged.
+
+    Expected header: Authorization: Bearer <token>
+    """
+    try:
+        is_valid, payload_or_error = get_request_payload(request)
+        if not is_valid:
+            return Response({
+                'success': False,
+                'error': payload_or_error
+            }, status=status.HTTP_401_UNAUTHORIZED)
+
+        profile = get_profile(payload_or_error.get('user_id'))
+        if profile is None:
+            return Response({
+                'success': False,
+                'error': 'User not found'
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        headers = {
+            'ETag': profile['etag'],
+            'Cache-Control': 'private, no-cache',
+            'Vary': 'Authorization',
+        }
+        if profile['etag'] in [tag.strip() for tag in request.headers.get('If-None-Match', '').split(',')]:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        return Response({
+            'success': True,
+            'userId': profile['userId'],
+            'username': profile['username'],
+            'email': profile['email'],
+            'created_at': profile['created_at'],
+            'updated_at': profile['updated_at']
+        }, status=status.HTTP_200_OK, headers=headers)
+
+    except Exception as e:
+        return Response({
+            'success': False,
+            'error': f'Profile fetch failed: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
 @api_view(['POST'])
+@idempotent
 def change_password(request):
     """
     Change user password
@@ -250,7 +330,7 @@ def change_password(request):
 
         # Get user
         try:
-            user = User.objects.get(id=user_id)
+            user = User.objects.get(id=user_id, is_active=True)
         except User.DoesNotExist:
             return Response({
                 'success': False,
@@ -286,6 +366,7 @@ def change_password(request):
         # Update password
         user.password = new_password  # Will be hashed in model's save method
         user.save()
+        audit.emit(audit.PASSWORD_CHANGE, user.id, request)
 
         return Response({
             'success': True,
@@ -300,6 +381,7 @@ def change_password(request):
 
 
 @api_view(['POST'])
+@idempotent
 def update_profile(request):
     """
     Update user profile (username and/or email)
@@ -329,7 +411,7 @@ def update_profile(request):
 
         # Get user
         try:
-            user = User.objects.get(id=user_id)
+            user = User.objects.get(id=user_id, is_active=True)
         except User.DoesNotExist:
             return Response({
                 'success': False,
@@ -380,9 +462,12 @@ def update_profile(request):
                 }, status=status.HTTP_400_BAD_REQUEST)
 
         # Update user
+        changed = [field for field, value in (('username', username), ('email', email))
+                   if getattr(user, field) != value]
         user.username = username
         user.email = email
         user.save()
+        audit.emit(audit.PROFILE_UPDATE, user.id, request, changed=changed)
 
         return Response({
             'success': True,
@@ -399,10 +484,12 @@ def update_profile(request):
 
 
 @api_view(['POST'])
+@idempotent
 def delete_account(request):
     """
     Delete user account
-    
+    The account is deactivated at once and deleted by a background job
+
     Expected header: Authorization: Bearer <token>
     Expected JSON payload:
     {
@@ -427,7 +514,7 @@ def delete_account(request):
 
         # Get user
         try:
-            user = User.objects.get(id=user_id)
+            user = User.objects.get(id=user_id, is_active=True)
         except User.DoesNotExist:
             return Response({
                 'success': False,
@@ -451,8 +538,12 @@ def delete_account(request):
                 'error': 'Incorrect password'
             }, status=status.HTTP_401_UNAUTHORIZED)
 
-        # Delete user
-        user.delete()
+        # Deactivate now; the user and everything that references them is deleted in the background
+        audit.emit(audit.ACCOUNT_DELETE, user.id, request, email=user.email)
+        with transaction.atomic():
+            user.is_active = False
+            user.save(update_fields=['is_active', 'updated_at'])
+            enqueue(DELETE_USER, {'user_id': user.id})
 
         return Response({
             'success': True,
@@ -465,3 +556,42 @@ def delete_account(request):
             'error': f'Account deletion failed: {str(e)}'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+
+@require_GET
+def export_users(request):
+    """
+    Stream the users table as CSV or JSON Lines
+
+    Staff only: requires a Django admin session (log in at /admin/ first).
+    Query parameters: format (csv or jsonl, default csv), fields (comma
+    separated), start, end (ISO 8601, filter on created_at)
+    """
+    if not (request.user.is_authenticated and request.user.is_staff):
+        return JsonResponse({
+            'success': False,
+            'error': 'Staff access required'
+        }, status=status.HTTP_403_FORBIDDEN)
+
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in export.FORMATS:
+        return JsonResponse({
+            'success': False,
+            'error': f"format must be one of: {', '.join(export.FORMATS)}"
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        fields = export.parse_fields(request.GET.get('fields'))
+        start = export.parse_time(request.GET.get('start'))
+        end = export.parse_time(request.GET.get('end'))
+    except ValueError as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    response = StreamingHttpResponse(
+        streaming.stream(request, export.render(export.iter_users(fields, start, end), fields, export_format)),
+        content_type='text/csv' if export_format == 'csv' else 'application/x-ndjson',
+    )
+    response['Content-Disposition'] = f'attachment; filename="users.{export_format}"'
+    return response
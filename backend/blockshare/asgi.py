@@ -2,6 +2,8 @@
 ASGI config for blockshare project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Server-Sent Events for chain notifications are served here rather than through
+Django's request handling; run with an ASGI server such as uvicorn.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
@@ -13,5 +15,15 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'blockshare.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported after Django is set up since it uses the ORM
+from notifications.stream import stream_app  # noqa: E402
+
+
+async def application(scope, receive, send):
+    """Route the event stream to its own ASGI app and everything else to Django"""
+    if scope['type'] == 'http' and scope['path'].rstrip('/') == '/api/events/stream':
+        return await stream_app(scope, receive, send)
+    return await django_application(scope, receive, send)
 
@@ -2,6 +2,7 @@
 Django settings for blockshare project.
 """
 
+import os
 from pathlib import Path
 from decouple import config
 
@@ -33,11 +34,16 @@ INSTALLED_APPS = [
     'rest_framework',
     'corsheaders',
     'authentication',
+    'files',
+    'audit',
+    'notifications',
+    'jobs',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',  # CORS middleware
+    'authentication.admission.AdmissionControlMiddleware',  # Sheds password-hashing requests under load
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -65,6 +71,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'blockshare.wsgi.application'
+ASGI_APPLICATION = 'blockshare.asgi.application'
 
 
 # Database
@@ -86,6 +93,20 @@ DATABASES = {
 }
 
 
+# Cache
+# Use a shared backend (e.g. django.core.cache.backends.redis.RedisCache) when
+# running more than one process so cache invalidation reaches all of them.
+
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='blockshare'),
+    }
+}
+
+PROFILE_CACHE_TIMEOUT = 300
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -159,6 +180,13 @@ CORS_ALLOW_HEADERS = [
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
+    'upload-offset',
+    'if-none-match',
+    'idempotency-key',
+]
+
+CORS_EXPOSE_HEADERS = [
+    'etag',
 ]
 
 # REST Framework settings
@@ -167,8 +195,107 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [],
 }
 
+# Breached-password filter built by `manage.py build_breach_filter`; the check is skipped if the file is missing
+BREACHED_PASSWORD_FILTER = config('BREACHED_PASSWORD_FILTER', default=str(BASE_DIR / 'data' / 'breached-passwords.bloom'))
+
+# Rows fetched per query by the user export
+USER_EXPORT_CHUNK_SIZE = 2000
+
+# Admission Control Settings
+ADMISSION_CONTROLLED_PATHS = [
+    '/api/register/',
+    '/api/login/',
+    '/api/change-password/',
+    '/api/delete-account/',
+]
+ADMISSION_MAX_CONCURRENT = config('ADMISSION_MAX_CONCURRENT', default=os.cpu_count() or 1, cast=int)
+ADMISSION_MAX_QUEUE = config('ADMISSION_MAX_QUEUE', default=2 * (os.cpu_count() or 1), cast=int)
+ADMISSION_QUEUE_TIMEOUT = config('ADMISSION_QUEUE_TIMEOUT', default=2.0, cast=float)  # Seconds
+ADMISSION_RETRY_AFTER = 1  # Seconds, sent in Retry-After on a 503
+
+# Idempotency-Key Settings
+IDEMPOTENCY_TTL = 60 * 60  # How long a completed response is replayed
+IDEMPOTENCY_LOCK_TIMEOUT = 60  # After this an unfinished first request is treated as abandoned
+IDEMPOTENCY_WAIT_TIMEOUT = 10  # How long a concurrent retry waits for the first request
+IDEMPOTENCY_PURGE_INTERVAL = 60 * 60  # Seconds between background sweeps of expired keys
+
 # JWT Settings
 JWT_SECRET_KEY = config('JWT_SECRET_KEY', default='your-jwt-secret-key-change-in-production')
 JWT_ALGORITHM = 'HS256'
 JWT_EXPIRATION_HOURS = 24
 
+
+# Relayer Settings
+RELAYER_RPC_URL = config('RELAYER_RPC_URL', default='http://127.0.0.1:8545')
+RELAYER_CONTRACT_ADDRESS = config('RELAYER_CONTRACT_ADDRESS', default='')
+RELAYER_PRIVATE_KEY = config('RELAYER_PRIVATE_KEY', default='')  # Empty uses the node's first unlocked account
+RELAYER_ARTIFACT_PATH = BASE_DIR.parent / 'client' / 'src' / 'artifacts' / 'contracts' / 'Upload.sol' / 'Upload.json'
+RELAYER_FLUSH_INTERVAL = config('RELAYER_FLUSH_INTERVAL', default=5, cast=float)
+RELAYER_MAX_BATCH_SIZE = 50
+RELAYER_MAX_ITEMS_PER_FLUSH = 1000
+RELAYER_MAX_ATTEMPTS = 3
+RELAYER_CONFIRM_TIMEOUT = 120
+RELAYER_RECEIPT_TIMEOUT = config('RELAYER_RECEIPT_TIMEOUT', default=900, cast=int)  # Seconds before an unmined transaction fails
+RELAYER_SIGNATURE_MAX_AGE = 300  # Seconds a signed relay request stays valid
+RELAYER_USER_HOURLY_LIMIT = config('RELAYER_USER_HOURLY_LIMIT', default=200, cast=int)  # URIs per user per hour
+
+# Upload Settings
+UPLOAD_STORAGE_BACKEND = config('UPLOAD_STORAGE_BACKEND', default='files.storage.LocalStorage')
+UPLOAD_STORAGE_ROOT = config('UPLOAD_STORAGE_ROOT', default=str(BASE_DIR / 'media' / 'ipfs'))
+UPLOAD_TEMP_DIR = config('UPLOAD_TEMP_DIR', default=str(BASE_DIR / 'media' / 'partial'))
+UPLOAD_STORAGE_TIMEOUT = 300
+UPLOAD_CHUNK_SIZE = 5 * 1024 * 1024  # Suggested to clients; chunks of any size are streamed
+UPLOAD_MAX_SIZE = config('UPLOAD_MAX_SIZE', default=1024 * 1024 * 1024, cast=int)
+UPLOAD_LOCK_TIMEOUT = 300
+UPLOAD_SESSION_TTL = config('UPLOAD_SESSION_TTL', default=24 * 60 * 60, cast=int)  # Idle seconds before an unfinished upload is abandoned
+UPLOAD_MAX_OPEN_SESSIONS = config('UPLOAD_MAX_OPEN_SESSIONS', default=5, cast=int)  # Unfinished uploads per user
+UPLOAD_PURGE_INTERVAL = 60 * 60  # Seconds between sweeps for abandoned uploads
+PARTIAL_HASH_BYTES = 64 * 1024  # Prefix hashed for the cheap duplicate pre-check
+IPFS_API_URL = config('IPFS_API_URL', default='http://127.0.0.1:5001')
+PINATA_UPLOAD_URL = config('PINATA_UPLOAD_URL', default='https://uploads.pinata.cloud/v3/files')
+PINATA_JWT = config('PINATA_JWT', default='')
+
+# IPFS Gateway Proxy Settings
+GATEWAY_UPSTREAM_URL = config('GATEWAY_UPSTREAM_URL', default='https://gateway.pinata.cloud/ipfs/')
+GATEWAY_CACHE_DIR = config('GATEWAY_CACHE_DIR', default=str(BASE_DIR / 'media' / 'gateway'))
+GATEWAY_CACHE_MAX_SIZE = config('GATEWAY_CACHE_MAX_SIZE', default=1024 * 1024 * 1024, cast=int)
+GATEWAY_TIMEOUT = 60  # Seconds per upstream socket operation
+GATEWAY_FETCH_TIMEOUT = 300  # Seconds for a whole upstream download
+GATEWAY_MAX_OBJECT_SIZE = config('GATEWAY_MAX_OBJECT_SIZE', default=100 * 1024 * 1024, cast=int)
+GATEWAY_MAX_AGE = 365 * 24 * 60 * 60
+
+# Thumbnail Settings
+THUMBNAIL_DIR = config('THUMBNAIL_DIR', default=str(BASE_DIR / 'media' / 'thumbnails'))
+THUMBNAIL_SIZES = {
+    'thumb': 256,
+    'preview': 1024,
+}
+THUMBNAIL_QUALITY = 80
+THUMBNAIL_WORKERS = config('THUMBNAIL_WORKERS', default=2, cast=int)
+THUMBNAIL_TIMEOUT = 60
+
+# Background Job Settings
+JOB_WORKERS = config('JOB_WORKERS', default=2, cast=int)
+JOB_POLL_INTERVAL = 1  # Seconds an idle worker waits before looking for jobs again
+JOB_VISIBILITY_TIMEOUT = 300  # Seconds before a claimed job that has not finished is handed to another worker
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_DELAY = 10  # Seconds before the first retry, doubling on each further attempt
+JOB_RETENTION = 7 * 24 * 60 * 60  # Seconds completed jobs are kept
+JOB_DELETE_BATCH_SIZE = 500  # Rows per transaction when deleting an account
+
+# Audit Settings
+AUDIT_FLUSH_INTERVAL = config('AUDIT_FLUSH_INTERVAL', default=2, cast=float)
+AUDIT_BATCH_SIZE = 500
+AUDIT_MAX_BUFFER = 100000
+AUDIT_EXPORT_CHUNK_SIZE = 5000
+AUDIT_ARCHIVE_DIR = config('AUDIT_ARCHIVE_DIR', default=str(BASE_DIR / 'media' / 'audit_archive'))
+
+# Chain Indexer and Event Stream Settings
+INDEXER_POLL_INTERVAL = config('INDEXER_POLL_INTERVAL', default=2, cast=float)
+INDEXER_CONFIRMATIONS = config('INDEXER_CONFIRMATIONS', default=0, cast=int)
+INDEXER_MAX_BLOCKS = 2000
+EVENT_STREAM_POLL_INTERVAL = 1
+EVENT_STREAM_BATCH_SIZE = 500
+EVENT_STREAM_QUEUE_SIZE = 100
+EVENT_STREAM_HEARTBEAT = 15
+EVENT_STREAM_MAX_BACKOFF = 30  # Seconds between poll retries while the database is failing
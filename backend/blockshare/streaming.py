@@ -0,0 +1,65 @@
+"""
+Streaming response bodies that stay streaming under WSGI and ASGI
+
+Django 4.2 collects a synchronous iterator into a list before sending it
+under ASGI (and an asynchronous one under WSGI), so a generator body would
+be held in memory whole on the wrong kind of server. stream() hands Django
+the kind of iterator the running server consumes.
+"""
+import os
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, StreamingHttpResponse
+
+READ_SIZE = 64 * 1024
+_DONE = object()
+
+
+def is_asgi(request):
+    return isinstance(request, ASGIRequest)
+
+
+async def _aiterate(iterator):
+    """Pull each part of a synchronous iterator on Django's sync thread"""
+    iterator = iter(iterator)
+    try:
+        while True:
+            part = await sync_to_async(next)(iterator, _DONE)
+            if part is _DONE:
+                return
+            yield part
+    finally:
+        if hasattr(iterator, 'close'):
+            await sync_to_async(iterator.close)()
+
+
+def stream(request, iterator):
+    """Return iterator in the form the server serving request streams without buffering"""
+    return _aiterate(iterator) if is_asgi(request) else iterator
+
+
+def iter_file(path, start, length):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            block = f.read(min(READ_SIZE, length))
+            if not block:
+                break
+            length -= len(block)
+            yield block
+
+
+def file_response(request, path, content_type):
+    """
+    Serve a whole file
+    FileResponse can use the WSGI server's file wrapper, but under ASGI it is
+    read into memory first, so there the file is streamed in blocks instead
+    """
+    if not is_asgi(request):
+        return FileResponse(open(path, 'rb'), content_type=content_type)
+
+    size = os.path.getsize(path)
+    response = StreamingHttpResponse(stream(request, iter_file(path, 0, size)), content_type=content_type)
+    response['Content-Length'] = str(size)
+    return response
@@ -7,5 +7,7 @@ from django.urls import path, include
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('authentication.urls')),
+    path('api/files/', include('files.urls')),
+    path('api/audit/', include('audit.urls')),
 ]
 
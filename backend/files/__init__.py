@@ -0,0 +1 @@
+# Files App
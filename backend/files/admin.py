@@ -0,0 +1,10 @@
+from django.contrib import admin
+from .models import PendingAdd
+
+
+@admin.register(PendingAdd)
+class PendingAddAdmin(admin.ModelAdmin):
+    list_display = ('id', 'owner', 'uri', 'status', 'attempts', 'tx_hash', 'created_at')
+    list_filter = ('status',)
+    search_fields = ('owner', 'uri', 'tx_hash')
+    readonly_fields = ('created_at', 'updated_at', 'confirmed_at')
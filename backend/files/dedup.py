@@ -0,0 +1,107 @@
+"""
+Content-hash index used to skip uploading and pinning content we already have
+
+Clients first send a cheap partial hash (the first PARTIAL_HASH_BYTES plus
+the size). Only when that matches a stored file do they need to hash the
+whole file; a full SHA-256 match adds them as an owner without any bytes
+being transferred.
+"""
+import hashlib
+import logging
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import FileOwner, PendingAdd, StoredFile
+from .storage import get_storage
+
+logger = logging.getLogger(__name__)
+
+
+def partial_hash(path):
+    """SHA-256 of the first PARTIAL_HASH_BYTES of a file"""
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read(settings.PARTIAL_HASH_BYTES)).hexdigest()
+
+
+def find(sha256, size=None):
+    queryset = StoredFile.objects.filter(sha256=sha256)
+    if size is not None:
+        queryset = queryset.filter(size=size)
+    return queryset.first()
+
+
+def has_candidate(partial_sha256, size):
+    return StoredFile.objects.filter(partial_sha256=partial_sha256, size=size).exists()
+
+
+def register(sha256, partial_sha256, size, cid, content_type=''):
+    """Record stored content, tolerating a concurrent upload of the same bytes"""
+    try:
+        with transaction.atomic():
+            return StoredFile.objects.create(
+                sha256=sha256, partial_sha256=partial_sha256, size=size,
+                cid=cid, content_type=content_type,
+            )
+    except IntegrityError:
+        return StoredFile.objects.get(sha256=sha256)
+
+
+def add_owner(stored_file, user, filename):
+    """
+    Reference stored content from a user, counting each user once
+    Returns None if the content was released and removed in the meantime
+    """
+    with transaction.atomic():
+        # Lock the row so a concurrent release cannot delete it under us
+        if not list(StoredFile.objects.select_for_update().filter(id=stored_file.id).values_list('id', flat=True)):
+            return None
+        try:
+            with transaction.atomic():
+                owner = FileOwner.objects.create(stored_file=stored_file, user=user, filename=filename)
+        except IntegrityError:
+            return FileOwner.objects.get(stored_file=stored_file, user=user)
+        StoredFile.objects.filter(id=stored_file.id).update(ref_count=F('ref_count') + 1)
+    return owner
+
+
+def is_on_chain(cid):
+    """
+    Whether an ipfs:// URI for the content has been, or is being, written to the contract
+    On-chain lists are shared with granted viewers and outlive any account here
+    """
+    from notifications.models import ChainEvent
+
+    uri = f'ipfs://{cid}'
+    return (
+        PendingAdd.objects.filter(uri=uri).exclude(status=PendingAdd.STATUS_FAILED).exists()
+        or ChainEvent.objects.filter(event_type=ChainEvent.TYPE_FILE, url=uri).exists()
+    )
+
+
+def release(stored_file):
+    """
+    Drop one reference to stored content
+    The content is removed from storage once nobody references it, unless
+    its URI is recorded on-chain, in which case it is kept for viewers
+    """
+    with transaction.atomic():
+        locked = StoredFile.objects.select_for_update().filter(id=stored_file.id).first()
+        if locked is None:
+            return
+        if locked.ref_count > 0:
+            locked.ref_count -= 1
+            StoredFile.objects.filter(id=locked.id).update(ref_count=locked.ref_count)
+        if locked.ref_count == 0 and not is_on_chain(locked.cid):
+            locked.delete()
+            # Only once the deletion is committed, so a rolled back caller
+            # (such as a batch of an account deletion) never loses content
+            transaction.on_commit(lambda: _delete_content(locked.cid))
+
+
+def _delete_content(cid):
+    try:
+        get_storage().delete(cid)
+    except Exception as e:
+        logger.warning("Could not delete %s from storage: %s", cid, e)
@@ -0,0 +1,250 @@
+"""
+Caching proxy in front of an IPFS HTTP gateway
+
+CIDs are immutable, so a cached object never goes stale: the only reason to
+drop one is space. Objects are kept on disk up to GATEWAY_CACHE_MAX_SIZE and
+evicted least recently used first, using the file mtime as the access time.
+Concurrent misses for the same CID in a process share a single download.
+Objects larger than GATEWAY_MAX_OBJECT_SIZE are refused, and a download
+that runs past GATEWAY_FETCH_TIMEOUT is abandoned.
+"""
+import os
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import Future, TimeoutError
+
+from django.conf import settings
+
+from .models import StoredFile
+from .storage import get_storage
+
+CID_REGEX = r'^[a-zA-Z0-9]{46,128}$'
+CONTENT_TYPE_REGEX = r'^[a-z0-9][a-z0-9!#$&^_.+-]*/[a-z0-9][a-z0-9!#$&^_.+-]*$'
+# Only these are shown inline. Anything else, such as HTML or SVG a user
+# uploaded, is served as a download so it never runs on the API origin
+INLINE_CONTENT_TYPES = frozenset({
+    'image/png', 'image/jpeg', 'image/gif', 'image/webp', 'image/avif', 'image/bmp',
+})
+READ_SIZE = 64 * 1024
+EVICT_TO_RATIO = 0.9  # Evict down to this share of the limit so eviction does not run on every miss
+
+
+class GatewayError(Exception):
+    def __init__(self, message, status=502):
+        super().__init__(message)
+        self.status = status
+
+
+_inflight = {}
+_inflight_lock = threading.Lock()
+_cache_bytes = None  # This process's estimate of the cache size, corrected on every eviction pass
+_cache_lock = threading.Lock()
+
+
+def is_valid_cid(cid):
+    return bool(re.match(CID_REGEX, cid))
+
+
+def cache_path(cid):
+    return os.path.join(settings.GATEWAY_CACHE_DIR, cid[-2:], cid)
+
+
+def _content_type_path(path):
+    return f'{path}.type'
+
+
+def normalize_content_type(value):
+    """The bare lowercase type/subtype of value, or application/octet-stream if it is not one"""
+    value = str(value or '').split(';', 1)[0].strip().lower()
+    return value if re.match(CONTENT_TYPE_REGEX, value) else 'application/octet-stream'
+
+
+def content_type(cid, path):
+    """Content type recorded from the upstream response, or from the upload for local content"""
+    try:
+        with open(_content_type_path(path)) as f:
+            return normalize_content_type(f.read())
+    except OSError:
+        pass
+    stored_file = StoredFile.objects.filter(cid=cid).only('content_type').first()
+    return normalize_content_type(stored_file and stored_file.content_type)
+
+
+def content_headers(cid, content_type):
+    """Headers that stop user content from running scripts on the API origin"""
+    disposition = 'inline' if content_type in INLINE_CONTENT_TYPES else 'attachment'
+    return {
+        'Content-Disposition': f'{disposition}; filename="{cid}"',
+        'Content-Security-Policy': 'sandbox',
+        'X-Content-Type-Options': 'nosniff',
+    }
+
+
+def _local_path(cid):
+    """Content kept by the local storage backend is served straight from disk"""
+    storage = get_storage()
+    if hasattr(storage, 'path'):
+        path = storage.path(cid)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def get(cid):
+    """
+    Return the path of a local copy of cid, fetching it on a miss
+    Raises GatewayError when the upstream gateway cannot provide it
+    """
+    path = _local_path(cid)
+    if path:
+        return path
+
+    path = cache_path(cid)
+    try:
+        # Touch on hit so eviction sees the access
+        os.utime(path)
+        return path
+    except FileNotFoundError:
+        pass
+
+    with _inflight_lock:
+        future = _inflight.get(cid)
+        leader = future is None
+        if leader:
+            future = _inflight[cid] = Future()
+
+    if not leader:
+        # The leader gives up by GATEWAY_FETCH_TIMEOUT, plus at most one slow read
+        try:
+            return future.result(timeout=settings.GATEWAY_FETCH_TIMEOUT + settings.GATEWAY_TIMEOUT)
+        except TimeoutError:
+            raise GatewayError('Timed out waiting for the upstream gateway', status=504)
+
+    try:
+        _download(cid, path)
+    except Exception as e:
+        future.set_exception(e)
+        raise
+    else:
+        future.set_result(path)
+    finally:
+        with _inflight_lock:
+            _inflight.pop(cid, None)
+
+    return path
+
+
+def _download(cid, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+    url = settings.GATEWAY_UPSTREAM_URL.rstrip('/') + '/' + cid
+    max_size = settings.GATEWAY_MAX_OBJECT_SIZE
+    deadline = time.monotonic() + settings.GATEWAY_FETCH_TIMEOUT
+    try:
+        # GATEWAY_TIMEOUT bounds each socket operation; the deadline bounds the whole download
+        with urllib.request.urlopen(url, timeout=settings.GATEWAY_TIMEOUT) as response:
+            content_type = response.headers.get('Content-Type', 'application/octet-stream')
+            declared = response.headers.get('Content-Length')
+            if declared and declared.isdigit() and int(declared) > max_size:
+                raise GatewayError(f'Object is larger than {max_size} bytes', status=502)
+            size = 0
+            with open(tmp_path, 'wb') as f:
+                for block in iter(lambda: response.read(READ_SIZE), b''):
+                    size += len(block)
+                    if size > max_size:
+                        raise GatewayError(f'Object is larger than {max_size} bytes', status=502)
+                    if time.monotonic() > deadline:
+                        raise GatewayError('Upstream gateway download took too long', status=504)
+                    f.write(block)
+    except GatewayError:
+        _remove(tmp_path)
+        raise
+    except urllib.error.HTTPError as e:
+        _remove(tmp_path)
+        raise GatewayError(f'Upstream gateway returned {e.code}', status=404 if e.code == 404 else 502)
+    except Exception as e:
+        _remove(tmp_path)
+        raise GatewayError(f'Upstream gateway fetch failed: {e}')
+
+    with open(_content_type_path(path), 'w') as f:
+        f.write(content_type)
+    os.replace(tmp_path, path)
+    _account(size)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _account(added):
+    global _cache_bytes
+    with _cache_lock:
+        if _cache_bytes is None:
+            _cache_bytes = _scan()[0]
+        else:
+            _cache_bytes += added
+        if _cache_bytes > settings.GATEWAY_CACHE_MAX_SIZE:
+            _cache_bytes = _evict()
+
+
+def _scan():
+    total = 0
+    entries = []
+    root = settings.GATEWAY_CACHE_DIR
+    for shard in os.scandir(root):
+        if not shard.is_dir():
+            continue
+        for entry in os.scandir(shard.path):
+            if entry.name.endswith(('.tmp', '.type')):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            total += stat.st_size
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+    return total, entries
+
+
+def _evict():
+    """Remove least recently used objects until the cache is under its target size"""
+    total, entries = _scan()
+    target = settings.GATEWAY_CACHE_MAX_SIZE * EVICT_TO_RATIO
+    for mtime, size, path in sorted(entries):
+        if total <= target:
+            break
+        _remove(path)
+        _remove(_content_type_path(path))
+        total -= size
+    return total
+
+
+def parse_range(header, size):
+    """
+    Parse a single-range Range header against an object size
+    Returns: (start, end) inclusive, None for no usable range, or raises ValueError if unsatisfiable
+    """
+    match = re.match(r'^bytes=(\d*)-(\d*)$', header.strip())
+    if not match or not any(match.groups()):
+        return None
+
+    start, end = match.groups()
+    if not start:
+        # Suffix range: the last N bytes
+        length = int(end)
+        if length == 0:
+            raise ValueError('Unsatisfiable range')
+        return max(0, size - length), size - 1
+
+    start = int(start)
+    end = int(end) if end else size - 1
+    if start >= size or end < start:
+        raise ValueError('Unsatisfiable range')
+    return start, min(end, size - 1)
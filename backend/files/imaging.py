@@ -0,0 +1,25 @@
+"""
+Image resizing run inside the thumbnail process pool
+
+Kept free of Django imports so worker processes can import it without
+setting up the project.
+"""
+import os
+
+from PIL import Image, ImageOps
+
+
+def render_thumbnail(src_path, dest_path, size, quality=80):
+    """Write a WebP no larger than size x size, preserving aspect ratio"""
+    with Image.open(src_path) as img:
+        # Let the JPEG decoder scale down while decoding instead of after
+        img.draft('RGB', (size, size))
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail((size, size), Image.LANCZOS)
+        if img.mode not in ('RGB', 'RGBA'):
+            img = img.convert('RGBA' if 'A' in img.getbands() or 'transparency' in img.info else 'RGB')
+
+        tmp_path = f'{dest_path}.{os.getpid()}.tmp'
+        img.save(tmp_path, 'WEBP', quality=quality, method=4)
+    os.replace(tmp_path, dest_path)
+    return dest_path
@@ -0,0 +1,13 @@
+"""
+Delete abandoned uploads and their partial files
+"""
+from django.core.management.base import BaseCommand
+
+from files.uploads import purge_expired
+
+
+class Command(BaseCommand):
+    help = 'Delete unfinished uploads idle for longer than UPLOAD_SESSION_TTL, with their partial files'
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Deleted {purge_expired()} abandoned upload(s)')
@@ -0,0 +1,33 @@
+"""
+Flush queued on-chain adds to the Upload contract on a fixed interval
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from files.relayer import Relayer, flush
+
+
+class Command(BaseCommand):
+    help = 'Submit pending uploads as one addBatch transaction per owner every flush interval'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=settings.RELAYER_FLUSH_INTERVAL,
+                            help='Seconds between flushes')
+        parser.add_argument('--once', action='store_true', help='Flush a single time and exit')
+
+    def handle(self, *args, **options):
+        relayer = Relayer()
+        self.stdout.write(f'Relaying from {relayer.sender} to {relayer.contract.address}')
+
+        while True:
+            started = time.monotonic()
+            result = flush(relayer)
+            if result['transactions'] or result['confirmed']:
+                self.stdout.write(
+                    f"Sent {result['transactions']} transaction(s), confirmed {result['confirmed']} item(s)"
+                )
+            if options['once']:
+                break
+            time.sleep(max(0, options['interval'] - (time.monotonic() - started)))
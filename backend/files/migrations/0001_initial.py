@@ -0,0 +1,72 @@
+# Generated by Django 4.2.7 on 2026-10-19 09:26
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ("authentication", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PendingAdd",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("owner", models.CharField(max_length=42)),
+                ("uri", models.CharField(max_length=255)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pending"),
+                            ("submitted", "Submitted"),
+                            ("confirmed", "Confirmed"),
+                            ("failed", "Failed"),
+                        ],
+                        default="pending",
+                        max_length=16,
+                    ),
+                ),
+                ("attempts", models.PositiveIntegerField(default=0)),
+                ("tx_hash", models.CharField(blank=True, max_length=66)),
+                ("block_number", models.PositiveBigIntegerField(blank=True, null=True)),
+                ("error", models.TextField(blank=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("confirmed_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="pending_adds",
+                        to="authentication.user",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "relayer_pending_adds",
+                "ordering": ["id"],
+                "indexes": [
+                    models.Index(
+                        fields=["status", "owner"], name="relayer_pen_status_cc8365_idx"
+                    ),
+                    models.Index(
+                        fields=["tx_hash"], name="relayer_pen_tx_hash_a8708f_idx"
+                    ),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,87 @@
+# Generated by Django 4.2.7 on 2026-10-19 09:29
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("authentication", "0001_initial"),
+        ("files", "0002_uploadsession"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StoredFile",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("sha256", models.CharField(max_length=64, unique=True)),
+                ("partial_sha256", models.CharField(max_length=64)),
+                ("size", models.PositiveBigIntegerField()),
+                ("cid", models.CharField(db_index=True, max_length=255)),
+                ("content_type", models.CharField(blank=True, max_length=255)),
+                ("ref_count", models.PositiveIntegerField(default=0)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "db_table": "stored_files",
+                "indexes": [
+                    models.Index(
+                        fields=["partial_sha256", "size"],
+                        name="stored_file_partial_f2f77f_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="FileOwner",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("filename", models.CharField(max_length=255)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "stored_file",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="owners",
+                        to="files.storedfile",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="files",
+                        to="authentication.user",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "file_owners",
+                "ordering": ["-created_at"],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="fileowner",
+            constraint=models.UniqueConstraint(
+                fields=("stored_file", "user"), name="unique_file_owner"
+            ),
+        ),
+    ]
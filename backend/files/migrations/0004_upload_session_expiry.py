@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7 on 2026-10-19 09:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("files", "0003_storedfile_fileowner"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="uploadsession",
+            index=models.Index(
+                fields=["status", "updated_at"], name="upload_sess_status_7188ee_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-19 09:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("files", "0004_upload_session_expiry"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="pendingadd",
+            index=models.Index(fields=["uri"], name="relayer_pen_uri_054df9_idx"),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:07
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("authentication", "0002_idempotencyrecord_and_more"),
+        ("files", "0005_pendingadd_uri_index"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="pendingadd",
+            name="user",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="pending_adds",
+                to="authentication.user",
+            ),
+        ),
+    ]
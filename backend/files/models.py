@@ -0,0 +1,137 @@
+import uuid
+from django.db import models
+from authentication.models import User
+
+
+class PendingAdd(models.Model):
+    """An ipfs:// URI waiting to be written on-chain by the relayer"""
+    STATUS_PENDING = 'pending'
+    STATUS_SUBMITTED = 'submitted'
+    STATUS_CONFIRMED = 'confirmed'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_SUBMITTED, 'Submitted'),
+        (STATUS_CONFIRMED, 'Confirmed'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    # Kept without a user when the account is deleted: the row is the record that the
+    # URI went on-chain, which stops dedup.release() deleting content viewers still need
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='pending_adds')
+    owner = models.CharField(max_length=42)  # Wallet address the URI is added for
+    uri = models.CharField(max_length=255)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    tx_hash = models.CharField(max_length=66, blank=True)
+    block_number = models.PositiveBigIntegerField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    confirmed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'relayer_pending_adds'
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'owner']),
+            models.Index(fields=['tx_hash']),
+            models.Index(fields=['uri']),
+        ]
+
+    def __str__(self):
+        return f'{self.owner} {self.uri} ({self.status})'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'owner': self.owner,
+            'uri': self.uri,
+            'status': self.status,
+            'tx_hash': self.tx_hash or None,
+            'block_number': self.block_number,
+            'error': self.error or None,
+        }
+
+
+class UploadSession(models.Model):
+    """A resumable upload whose bytes are streamed to disk chunk by chunk"""
+    STATUS_UPLOADING = 'uploading'
+    STATUS_COMPLETE = 'complete'
+    STATUS_CHOICES = [
+        (STATUS_UPLOADING, 'Uploading'),
+        (STATUS_COMPLETE, 'Complete'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='upload_sessions')
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=255, blank=True)
+    size = models.PositiveBigIntegerField()
+    offset = models.PositiveBigIntegerField(default=0)  # Bytes received so far
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_UPLOADING)
+    sha256 = models.CharField(max_length=64, blank=True)
+    cid = models.CharField(max_length=255, blank=True)
+    locked_until = models.DateTimeField(null=True, blank=True)  # Set while a chunk is being written
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'upload_sessions'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'updated_at']),
+        ]
+
+    def __str__(self):
+        return f'{self.filename} ({self.offset}/{self.size})'
+
+    def to_dict(self):
+        return {
+            'upload_id': str(self.id),
+            'filename': self.filename,
+            'size': self.size,
+            'offset': self.offset,
+            'status': self.status,
+            'sha256': self.sha256 or None,
+            'cid': self.cid or None,
+        }
+
+
+class StoredFile(models.Model):
+    """Content stored once per SHA-256, shared by every user who uploads it"""
+    sha256 = models.CharField(max_length=64, unique=True)
+    partial_sha256 = models.CharField(max_length=64)  # Hash of the first PARTIAL_HASH_BYTES
+    size = models.PositiveBigIntegerField()
+    cid = models.CharField(max_length=255, db_index=True)
+    content_type = models.CharField(max_length=255, blank=True)
+    ref_count = models.PositiveIntegerField(default=0)  # Number of FileOwner rows
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'stored_files'
+        indexes = [
+            models.Index(fields=['partial_sha256', 'size']),
+        ]
+
+    def __str__(self):
+        return self.cid
+
+
+class FileOwner(models.Model):
+    """A user's reference to a stored file"""
+    stored_file = models.ForeignKey(StoredFile, on_delete=models.CASCADE, related_name='owners')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='files')
+    filename = models.CharField(max_length=255)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'file_owners'
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['stored_file', 'user'], name='unique_file_owner'),
+        ]
+
+    def __str__(self):
+        return f'{self.user} {self.stored_file}'
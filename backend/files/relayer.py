@@ -0,0 +1,256 @@
+"""
+Relayer that writes queued ipfs:// URIs to the Upload contract
+
+Pending adds are grouped per owner and submitted as a single
+``addBatch(owner, uris)`` transaction per flush, so a folder upload costs
+one transaction and one block wait instead of one per file.
+"""
+import datetime
+import json
+import logging
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import PendingAdd
+
+logger = logging.getLogger(__name__)
+
+
+def connect(rpc_url=None, contract_address=None, artifact_path=None):
+    """
+    Connect to the Upload contract
+    Returns: (web3, contract)
+    """
+    try:
+        from web3 import Web3
+    except ImportError:
+        raise ImproperlyConfigured("Talking to the Upload contract requires the 'web3' package")
+
+    w3 = Web3(Web3.HTTPProvider(rpc_url or settings.RELAYER_RPC_URL))
+    contract_address = contract_address or settings.RELAYER_CONTRACT_ADDRESS
+    if not contract_address:
+        raise ImproperlyConfigured("RELAYER_CONTRACT_ADDRESS is not set")
+
+    with open(artifact_path or settings.RELAYER_ARTIFACT_PATH) as f:
+        abi = json.load(f)['abi']
+    contract = w3.eth.contract(address=Web3.to_checksum_address(contract_address), abi=abi)
+    return w3, contract
+
+
+class Relayer:
+    """Thin wrapper around a web3 connection to the Upload contract"""
+
+    def __init__(self, rpc_url=None, contract_address=None, private_key=None, artifact_path=None):
+        self.w3, self.contract = connect(rpc_url, contract_address, artifact_path)
+
+        # Without a private key the node's first unlocked account signs,
+        # which is what a local Hardhat node provides out of the box.
+        self.private_key = private_key if private_key is not None else settings.RELAYER_PRIVATE_KEY
+        if self.private_key:
+            self.sender = self.w3.eth.account.from_key(self.private_key).address
+        else:
+            self.sender = self.w3.eth.accounts[0]
+        self._nonce = None
+
+    def send_batch(self, owner, uris):
+        """Submit one addBatch transaction and return its hash"""
+        from web3 import Web3
+
+        call = self.contract.functions.addBatch(Web3.to_checksum_address(owner), list(uris))
+        if not self.private_key:
+            return call.transact({'from': self.sender}).hex()
+
+        if self._nonce is None:
+            self._nonce = self.w3.eth.get_transaction_count(self.sender, 'pending')
+        tx = call.build_transaction({'from': self.sender, 'nonce': self._nonce})
+        signed = self.w3.eth.account.sign_transaction(tx, self.private_key)
+        tx_hash = self.w3.eth.send_raw_transaction(signed.rawTransaction)
+        self._nonce += 1
+        return tx_hash.hex()
+
+    def get_receipt(self, tx_hash, timeout=None):
+        """
+        Return the receipt for a transaction, or None if it is not mined yet
+        With a timeout, block for up to that many seconds
+        """
+        from web3.exceptions import TimeExhausted, TransactionNotFound
+
+        try:
+            if timeout:
+                return self.w3.eth.wait_for_transaction_receipt(tx_hash, timeout=timeout)
+            return self.w3.eth.get_transaction_receipt(tx_hash)
+        except (TimeExhausted, TransactionNotFound):
+            return None
+
+
+def relay_message(owner, uris, issued_at):
+    """The text the owner's wallet signs (EIP-191 personal_sign) to have uris added to its list"""
+    return '\n'.join(['BlockShare relay request', f'Owner: {owner.lower()}', f'Issued at: {issued_at}', 'URIs:', *uris])
+
+
+def verify_signature(owner, uris, issued_at, signature):
+    """Check that signature over the relay message was made by the owner address"""
+    try:
+        from eth_account import Account
+        from eth_account.messages import encode_defunct
+    except ImportError:
+        raise ImproperlyConfigured("Verifying wallet signatures requires the 'web3' package")
+
+    try:
+        signer = Account.recover_message(encode_defunct(text=relay_message(owner, uris, issued_at)),
+                                         signature=signature)
+    except Exception:
+        return False
+    return signer.lower() == owner.lower()
+
+
+def recent_count(user):
+    """Number of URIs the user queued within the last hour"""
+    since = timezone.now() - datetime.timedelta(hours=1)
+    return PendingAdd.objects.filter(user=user, created_at__gte=since).count()
+
+
+def enqueue(user, owner, uris):
+    """
+    Queue URIs to be added on-chain for an owner address
+    URIs the user already queued for the owner reuse the existing item
+    """
+    owner = owner.lower()
+    with transaction.atomic():
+        items = {
+            item.uri: item
+            for item in PendingAdd.objects.filter(user=user, owner=owner, uri__in=uris).exclude(status=PendingAdd.STATUS_FAILED)
+        }
+        for uri in uris:
+            if uri not in items:
+                # Created one by one because MySQL does not return ids from bulk_create
+                items[uri] = PendingAdd.objects.create(user=user, owner=owner, uri=uri)
+    return [items[uri] for uri in uris]
+
+
+def _claim_pending(limit):
+    """Atomically move pending items to submitted so concurrent flushes never double-send"""
+    with transaction.atomic():
+        items = list(
+            PendingAdd.objects.select_for_update(skip_locked=True)
+            .filter(status=PendingAdd.STATUS_PENDING)
+            .order_by('id')[:limit]
+        )
+        PendingAdd.objects.filter(id__in=[item.id for item in items]).update(
+            status=PendingAdd.STATUS_SUBMITTED,
+            attempts=F('attempts') + 1,
+            updated_at=timezone.now(),
+        )
+    return items
+
+
+def release_stale():
+    """Return items claimed by a flush that died before sending them"""
+    cutoff = timezone.now() - datetime.timedelta(seconds=settings.RELAYER_CONFIRM_TIMEOUT)
+    return PendingAdd.objects.filter(
+        status=PendingAdd.STATUS_SUBMITTED, tx_hash='', updated_at__lt=cutoff,
+    ).update(status=PendingAdd.STATUS_PENDING)
+
+
+def fail_unconfirmed():
+    """
+    Fail items whose transaction got no receipt within RELAYER_RECEIPT_TIMEOUT,
+    such as one dropped from the mempool or lost when a development node restarted
+    They are not resent automatically, since the transaction could still be mined
+    """
+    cutoff = timezone.now() - datetime.timedelta(seconds=settings.RELAYER_RECEIPT_TIMEOUT)
+    return (
+        PendingAdd.objects.filter(status=PendingAdd.STATUS_SUBMITTED, updated_at__lt=cutoff)
+        .exclude(tx_hash='')
+        .update(status=PendingAdd.STATUS_FAILED, error='No receipt for the transaction',
+                updated_at=timezone.now())
+    )
+
+
+def submit_pending(relayer, limit=None):
+    """
+    Send one addBatch transaction per owner for all pending items
+    Returns: list of submitted transaction hashes
+    """
+    limit = limit or settings.RELAYER_MAX_ITEMS_PER_FLUSH
+    batch_size = settings.RELAYER_MAX_BATCH_SIZE
+
+    groups = OrderedDict()
+    for item in _claim_pending(limit):
+        groups.setdefault(item.owner, []).append(item)
+
+    tx_hashes = []
+    for owner, items in groups.items():
+        for start in range(0, len(items), batch_size):
+            chunk = items[start:start + batch_size]
+            ids = [item.id for item in chunk]
+            try:
+                tx_hash = relayer.send_batch(owner, [item.uri for item in chunk])
+            except Exception as e:
+                logger.warning("addBatch for %s failed: %s", owner, e)
+                PendingAdd.objects.filter(id__in=ids, attempts__lt=settings.RELAYER_MAX_ATTEMPTS).update(
+                    status=PendingAdd.STATUS_PENDING, error=str(e),
+                )
+                PendingAdd.objects.filter(id__in=ids, attempts__gte=settings.RELAYER_MAX_ATTEMPTS).update(
+                    status=PendingAdd.STATUS_FAILED, error=str(e),
+                )
+                continue
+
+            PendingAdd.objects.filter(id__in=ids).update(tx_hash=tx_hash, error='', updated_at=timezone.now())
+            tx_hashes.append(tx_hash)
+
+    return tx_hashes
+
+
+def confirm_submitted(relayer, timeout=None):
+    """
+    Record receipts for submitted transactions
+    Returns: number of items confirmed
+    """
+    confirmed = 0
+    tx_hashes = (
+        PendingAdd.objects.filter(status=PendingAdd.STATUS_SUBMITTED)
+        .exclude(tx_hash='')
+        .values_list('tx_hash', flat=True)
+        .distinct()
+    )
+    for tx_hash in list(tx_hashes):
+        receipt = relayer.get_receipt(tx_hash, timeout=timeout)
+        if receipt is None:
+            continue
+
+        items = PendingAdd.objects.filter(status=PendingAdd.STATUS_SUBMITTED, tx_hash=tx_hash)
+        if receipt['status'] == 1:
+            confirmed += items.update(
+                status=PendingAdd.STATUS_CONFIRMED,
+                block_number=receipt['blockNumber'],
+                confirmed_at=timezone.now(),
+            )
+        else:
+            items.update(
+                status=PendingAdd.STATUS_FAILED,
+                block_number=receipt['blockNumber'],
+                error='Transaction reverted',
+            )
+
+    return confirmed
+
+
+def flush(relayer, timeout=None):
+    """
+    Submit everything pending, then wait for the receipts
+    With timeout=0, only receipts that are already available are recorded
+    """
+    release_stale()
+    tx_hashes = submit_pending(relayer)
+    confirmed = confirm_submitted(
+        relayer,
+        timeout=settings.RELAYER_CONFIRM_TIMEOUT if timeout is None else timeout,
+    )
+    failed = fail_unconfirmed()
+    return {'transactions': len(tx_hashes), 'confirmed': confirmed, 'failed': failed}
@@ -0,0 +1,22 @@
+"""
+Signal handlers for the files app
+"""
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from . import dedup, uploads
+from .models import FileOwner, StoredFile, UploadSession
+
+
+@receiver(post_delete, sender=FileOwner)
+def release_stored_file(sender, instance, **kwargs):
+    """Keep StoredFile.ref_count in step when an owner goes away, including account deletion"""
+    stored_file = StoredFile.objects.filter(id=instance.stored_file_id).first()
+    if stored_file is not None:
+        dedup.release(stored_file)
+
+
+@receiver(post_delete, sender=UploadSession)
+def remove_partial_file(sender, instance, **kwargs):
+    """Partial files are only found through their rows, so remove them with the row"""
+    uploads.discard_partial(instance)
@@ -0,0 +1,159 @@
+"""
+Pluggable storage backends for completed uploads
+
+A backend receives the assembled file on local disk together with its
+SHA-256 digest and returns the CID the content can be fetched by.
+"""
+import base64
+import json
+import os
+import shutil
+import urllib.request
+import uuid
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+CHUNK_SIZE = 64 * 1024
+
+
+def cid_from_sha256(digest):
+    """
+    Build a CIDv1 (raw codec, sha2-256 multihash) from a hex SHA-256 digest
+
+    This is the CID IPFS assigns to content stored as a single raw block, so
+    it is only a content address, not the IPFS CID, for multi-block files.
+    """
+    raw = bytes([0x01, 0x55, 0x12, 0x20]) + bytes.fromhex(digest)
+    return 'b' + base64.b32encode(raw).decode('ascii').lower().rstrip('=')
+
+
+class BaseStorage:
+    """Interface for upload storage backends"""
+
+    def store(self, path, sha256, filename, content_type):
+        """Persist the file at path and return its CID"""
+        raise NotImplementedError
+
+    def delete(self, cid):
+        """Remove content nobody references any more (a no-op for backends that cannot)"""
+        pass
+
+
+class LocalStorage(BaseStorage):
+    """Keep content on local disk, addressed by its raw-block CID"""
+
+    def __init__(self, root=None):
+        self.root = root or settings.UPLOAD_STORAGE_ROOT
+
+    def path(self, cid):
+        return os.path.join(self.root, cid[-2:], cid)
+
+    def store(self, path, sha256, filename, content_type):
+        cid = cid_from_sha256(sha256)
+        target = self.path(cid)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        if os.path.exists(target):
+            os.remove(path)
+        else:
+            shutil.move(path, target)
+        return cid
+
+    def open(self, cid):
+        return open(self.path(cid), 'rb')
+
+    def delete(self, cid):
+        if os.path.exists(self.path(cid)):
+            os.remove(self.path(cid))
+
+
+class _MultipartStorage(BaseStorage):
+    """Stream a file from disk to an HTTP endpoint as multipart/form-data"""
+    field_name = 'file'
+
+    def get_url(self):
+        raise NotImplementedError
+
+    def get_headers(self):
+        return {}
+
+    def get_fields(self, filename):
+        return {}
+
+    def parse_cid(self, response):
+        raise NotImplementedError
+
+    def store(self, path, sha256, filename, content_type):
+        boundary = uuid.uuid4().hex
+        preamble = b''
+        for name, value in self.get_fields(filename).items():
+            preamble += (
+                f'--{boundary}\r\n'
+                f'Content-Disposition: form-data; name="{name}"\r\n\r\n'
+                f'{value}\r\n'
+            ).encode('utf-8')
+        preamble += (
+            f'--{boundary}\r\n'
+            f'Content-Disposition: form-data; name="{self.field_name}"; filename="{filename}"\r\n'
+            f'Content-Type: {content_type or "application/octet-stream"}\r\n\r\n'
+        ).encode('utf-8')
+        epilogue = f'\r\n--{boundary}--\r\n'.encode('utf-8')
+
+        def body():
+            yield preamble
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                    yield chunk
+            yield epilogue
+
+        headers = self.get_headers()
+        headers['Content-Type'] = f'multipart/form-data; boundary={boundary}'
+        headers['Content-Length'] = str(len(preamble) + os.path.getsize(path) + len(epilogue))
+        request = urllib.request.Request(self.get_url(), data=body(), headers=headers, method='POST')
+        with urllib.request.urlopen(request, timeout=settings.UPLOAD_STORAGE_TIMEOUT) as response:
+            cid = self.parse_cid(json.load(response))
+
+        os.remove(path)
+        return cid
+
+
+class IPFSStorage(_MultipartStorage):
+    """Add content to an IPFS node through its HTTP RPC API"""
+
+    def get_url(self):
+        return f'{settings.IPFS_API_URL}/api/v0/add?cid-version=1&raw-leaves=true&pin=true'
+
+    def parse_cid(self, response):
+        return response['Hash']
+
+    def delete(self, cid):
+        url = f'{settings.IPFS_API_URL}/api/v0/pin/rm?arg={cid}'
+        request = urllib.request.Request(url, data=b'', method='POST')
+        urllib.request.urlopen(request, timeout=settings.UPLOAD_STORAGE_TIMEOUT).close()
+
+
+class PinataStorage(_MultipartStorage):
+    """Pin content through Pinata's (or a compatible stand-in's) v3 upload API"""
+
+    def get_url(self):
+        return settings.PINATA_UPLOAD_URL
+
+    def get_headers(self):
+        return {'Authorization': f'Bearer {settings.PINATA_JWT}'}
+
+    def get_fields(self, filename):
+        return {'name': filename}
+
+    def parse_cid(self, response):
+        return response['data']['cid']
+
+
+_storage = None
+
+
+def get_storage():
+    """Return the storage backend configured by UPLOAD_STORAGE_BACKEND"""
+    global _storage
+    if _storage is None:
+        _storage = import_string(settings.UPLOAD_STORAGE_BACKEND)()
+    return _storage
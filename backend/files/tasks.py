@@ -0,0 +1,42 @@
+"""
+Background jobs for the files app
+"""
+from django.conf import settings
+
+from jobs.queue import enqueue, task
+from . import relayer, uploads
+from .models import PendingAdd, UploadSession
+
+FLUSH_RELAYER = 'files.flush_relayer'
+PURGE_UPLOADS = 'files.purge_uploads'
+
+
+def schedule_flush():
+    """Queue a relayer flush one flush interval from now, unless one is already queued"""
+    if settings.RELAYER_CONTRACT_ADDRESS:
+        enqueue(FLUSH_RELAYER, delay=settings.RELAYER_FLUSH_INTERVAL, unique_key=FLUSH_RELAYER)
+
+
+@task(FLUSH_RELAYER)
+def flush_relayer():
+    # Receipts are picked up by later flushes rather than waited for, so a
+    # transaction that never mines does not hold a job worker
+    relayer.flush(relayer.Relayer(), timeout=0)
+    # Keep going until everything queued so far is confirmed or has failed
+    if PendingAdd.objects.filter(
+        status__in=[PendingAdd.STATUS_PENDING, PendingAdd.STATUS_SUBMITTED]
+    ).exists():
+        schedule_flush()
+
+
+def schedule_upload_purge():
+    """Queue a sweep for abandoned uploads, unless one is already queued"""
+    enqueue(PURGE_UPLOADS, delay=settings.UPLOAD_PURGE_INTERVAL, unique_key=PURGE_UPLOADS)
+
+
+@task(PURGE_UPLOADS)
+def purge_uploads():
+    uploads.purge_expired()
+    # Sweep again later while unfinished uploads remain
+    if UploadSession.objects.filter(status=UploadSession.STATUS_UPLOADING).exists():
+        schedule_upload_purge()
@@ -0,0 +1,569 @@
+import datetime
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.db import transaction
+from django.test import AsyncClient, TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+
+from authentication.jwt_utils import generate_token
+from authentication.models import User
+from jobs.models import Job
+from . import dedup, gateway, relayer, tasks, thumbnails, uploads
+from .models import FileOwner, PendingAdd, StoredFile, UploadSession
+
+try:
+    from eth_account import Account
+    from eth_account.messages import encode_defunct
+except ImportError:
+    Account = None
+
+OWNER = '0x' + 'a' * 40
+HARDHAT_RPC_URL = os.environ.get('RELAYER_TEST_RPC_URL', '')
+
+
+class FakeRelayer:
+    """Stands in for the web3 Relayer, recording batches instead of sending them"""
+
+    def __init__(self, fail_sends=False, receipt_status=1):
+        self.batches = []
+        self.fail_sends = fail_sends
+        self.receipt_status = receipt_status
+        self.mined = set()
+        self.receipt_timeouts = []
+
+    def send_batch(self, owner, uris):
+        if self.fail_sends:
+            raise ConnectionError('node unreachable')
+        self.batches.append((owner, list(uris)))
+        return f'0x{len(self.batches):064x}'
+
+    def get_receipt(self, tx_hash, timeout=None):
+        self.receipt_timeouts.append(timeout)
+        if tx_hash not in self.mined:
+            return None
+        return {'status': self.receipt_status, 'blockNumber': 7}
+
+
+class RelayerTests(TestCase):
+    def setUp(self):
+        self.user = User(username='alice', email='alice@example.com')
+        self.user.set_password('Passw0rd')
+        self.user.save()
+
+    def test_submit_groups_pending_adds_per_owner(self):
+        other = '0x' + 'b' * 40
+        relayer.enqueue(self.user, OWNER, ['ipfs://one', 'ipfs://two'])
+        relayer.enqueue(self.user, other, ['ipfs://three'])
+        fake = FakeRelayer()
+
+        tx_hashes = relayer.submit_pending(fake)
+
+        self.assertEqual(len(tx_hashes), 2)
+        self.assertEqual(fake.batches, [(OWNER, ['ipfs://one', 'ipfs://two']), (other, ['ipfs://three'])])
+        self.assertFalse(PendingAdd.objects.filter(status=PendingAdd.STATUS_PENDING).exists())
+        # Nothing left to send on the next flush
+        self.assertEqual(relayer.submit_pending(fake), [])
+
+    @override_settings(RELAYER_MAX_BATCH_SIZE=2)
+    def test_submit_splits_large_batches(self):
+        relayer.enqueue(self.user, OWNER, [f'ipfs://{i}' for i in range(5)])
+        fake = FakeRelayer()
+        relayer.submit_pending(fake)
+        self.assertEqual([len(uris) for owner, uris in fake.batches], [2, 2, 1])
+
+    def test_confirm_records_receipts(self):
+        items = relayer.enqueue(self.user, OWNER, ['ipfs://one'])
+        fake = FakeRelayer()
+        tx_hash = relayer.submit_pending(fake)[0]
+
+        self.assertEqual(relayer.confirm_submitted(fake), 0)
+        fake.mined.add(tx_hash)
+        self.assertEqual(relayer.confirm_submitted(fake), 1)
+
+        item = PendingAdd.objects.get(id=items[0].id)
+        self.assertEqual(item.status, PendingAdd.STATUS_CONFIRMED)
+        self.assertEqual(item.block_number, 7)
+        self.assertEqual(item.tx_hash, tx_hash)
+
+    def test_reverted_transaction_fails_items(self):
+        relayer.enqueue(self.user, OWNER, ['ipfs://one'])
+        fake = FakeRelayer(receipt_status=0)
+        fake.mined.add(relayer.submit_pending(fake)[0])
+        relayer.confirm_submitted(fake)
+        self.assertEqual(PendingAdd.objects.get().status, PendingAdd.STATUS_FAILED)
+
+    @override_settings(RELAYER_MAX_ATTEMPTS=2)
+    def test_send_errors_retry_then_fail(self):
+        relayer.enqueue(self.user, OWNER, ['ipfs://one'])
+        fake = FakeRelayer(fail_sends=True)
+
+        relayer.submit_pending(fake)
+        self.assertEqual(PendingAdd.objects.get().status, PendingAdd.STATUS_PENDING)
+        relayer.submit_pending(fake)
+        item = PendingAdd.objects.get()
+        self.assertEqual(item.status, PendingAdd.STATUS_FAILED)
+        self.assertEqual(item.error, 'node unreachable')
+
+    @override_settings(RELAYER_RECEIPT_TIMEOUT=600)
+    def test_unmined_transactions_fail_after_the_receipt_timeout(self):
+        relayer.enqueue(self.user, OWNER, ['ipfs://one'])
+        fake = FakeRelayer()
+        self.assertEqual(relayer.flush(fake, timeout=0)['failed'], 0)
+        self.assertEqual(PendingAdd.objects.get().status, PendingAdd.STATUS_SUBMITTED)
+
+        PendingAdd.objects.update(updated_at=timezone.now() - datetime.timedelta(seconds=601))
+        self.assertEqual(relayer.flush(fake, timeout=0)['failed'], 1)
+        item = PendingAdd.objects.get()
+        self.assertEqual(item.status, PendingAdd.STATUS_FAILED)
+        self.assertEqual(item.error, 'No receipt for the transaction')
+
+    @override_settings(RELAYER_CONTRACT_ADDRESS='0x' + 'c' * 40)
+    def test_flush_job_does_not_wait_for_receipts(self):
+        relayer.enqueue(self.user, OWNER, ['ipfs://one'])
+        fake = FakeRelayer()
+        with mock.patch('files.tasks.relayer.Relayer', return_value=fake):
+            tasks.flush_relayer()
+
+        self.assertEqual(fake.receipt_timeouts, [0])
+        # Still unconfirmed, so another flush is queued
+        self.assertTrue(Job.objects.filter(name=tasks.FLUSH_RELAYER, status=Job.STATUS_QUEUED).exists())
+
+    def test_enqueue_reuses_queued_items(self):
+        first = relayer.enqueue(self.user, OWNER, ['ipfs://one'])
+        second = relayer.enqueue(self.user, OWNER.upper().replace('0X', '0x'), ['ipfs://one', 'ipfs://two'])
+        self.assertEqual(second[0].id, first[0].id)
+        self.assertEqual(PendingAdd.objects.count(), 2)
+
+
+@unittest.skipUnless(
+    HARDHAT_RPC_URL and Account is not None and os.path.exists(settings.RELAYER_ARTIFACT_PATH),
+    'set RELAYER_TEST_RPC_URL to a running `npx hardhat node` after `npx hardhat compile`',
+)
+class HardhatRelayerTests(TestCase):
+    """The real Relayer against a freshly deployed Upload contract on a local node"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        from web3 import Web3
+
+        cls.w3 = Web3(Web3.HTTPProvider(HARDHAT_RPC_URL))
+        with open(settings.RELAYER_ARTIFACT_PATH) as f:
+            artifact = json.load(f)
+        contract = cls.w3.eth.contract(abi=artifact['abi'], bytecode=artifact['bytecode'])
+        tx_hash = contract.constructor().transact({'from': cls.w3.eth.accounts[0]})
+        cls.contract_address = cls.w3.eth.wait_for_transaction_receipt(tx_hash, timeout=30)['contractAddress']
+
+    def make_relayer(self, private_key=''):
+        return relayer.Relayer(rpc_url=HARDHAT_RPC_URL, contract_address=self.contract_address,
+                               private_key=private_key)
+
+    def uris_of(self, sender, owner):
+        return sender.contract.functions.display(owner).call({'from': owner})
+
+    def test_unlocked_account_sends_batches(self):
+        sender = self.make_relayer()
+        owner = Account.create().address
+        receipt = sender.get_receipt(sender.send_batch(owner, ['ipfs://a', 'ipfs://b']), timeout=30)
+        self.assertEqual(receipt['status'], 1)
+        self.assertEqual(self.uris_of(sender, owner), ['ipfs://a', 'ipfs://b'])
+
+    def test_signed_batches_track_the_nonce(self):
+        signer = Account.create()
+        funding = self.w3.eth.send_transaction({
+            'from': self.w3.eth.accounts[0], 'to': signer.address, 'value': 10 ** 18,
+        })
+        self.w3.eth.wait_for_transaction_receipt(funding, timeout=30)
+
+        sender = self.make_relayer(signer.key.hex())
+        owner = Account.create().address
+        # Sent back to back, so the second one relies on the locally tracked nonce
+        tx_hashes = [sender.send_batch(owner, ['ipfs://one']), sender.send_batch(owner, ['ipfs://two'])]
+        self.assertEqual(sender._nonce, 2)
+        for tx_hash in tx_hashes:
+            self.assertEqual(sender.get_receipt(tx_hash, timeout=30)['status'], 1)
+        self.assertEqual(self.uris_of(sender, owner), ['ipfs://one', 'ipfs://two'])
+
+    def test_unknown_transaction_has_no_receipt(self):
+        self.assertIsNone(self.make_relayer().get_receipt('0x' + '0' * 64))
+
+    def test_flush_confirms_pending_adds(self):
+        user = User.objects.create(username='alice', email='alice@example.com', password='x')
+        owner = Account.create().address
+        relayer.enqueue(user, owner, ['ipfs://one', 'ipfs://two'])
+
+        result = relayer.flush(self.make_relayer(), timeout=30)
+        self.assertEqual(result['confirmed'], 2)
+        self.assertEqual(set(PendingAdd.objects.values_list('status', flat=True)), {PendingAdd.STATUS_CONFIRMED})
+        self.assertEqual(self.uris_of(self.make_relayer(), owner), ['ipfs://one', 'ipfs://two'])
+
+
+@unittest.skipIf(Account is None, "requires the 'web3' package")
+class RelayAddViewTests(TestCase):
+    def setUp(self):
+        self.user = User(username='alice', email='alice@example.com')
+        self.user.set_password('Passw0rd')
+        self.user.save()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + generate_token(self.user.id, self.user.email))
+        self.wallet = Account.create()
+        # Keep the audit writer's background thread out of the test database
+        patcher = mock.patch('audit.events.emit')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def sign(self, owner, uris, issued_at, account=None):
+        message = encode_defunct(text=relayer.relay_message(owner, uris, issued_at))
+        return (account or self.wallet).sign_message(message).signature.hex()
+
+    def post(self, owner, uris, issued_at=None, signature=None):
+        issued_at = int(time.time()) if issued_at is None else issued_at
+        if signature is None:
+            signature = self.sign(owner, uris, issued_at)
+        return self.client.post('/api/files/relay/', {
+            'owner': owner, 'uris': uris, 'issued_at': issued_at, 'signature': signature,
+        }, format='json')
+
+    def test_owner_signature_is_accepted(self):
+        response = self.post(self.wallet.address, ['ipfs://one'])
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(PendingAdd.objects.get().owner, self.wallet.address.lower())
+
+    def test_signature_from_another_wallet_is_rejected(self):
+        issued_at = int(time.time())
+        signature = self.sign(self.wallet.address, ['ipfs://one'], issued_at, account=Account.create())
+        response = self.post(self.wallet.address, ['ipfs://one'], issued_at, signature)
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(PendingAdd.objects.exists())
+
+    def test_signature_must_cover_the_uris(self):
+        issued_at = int(time.time())
+        signature = self.sign(self.wallet.address, ['ipfs://one'], issued_at)
+        response = self.post(self.wallet.address, ['ipfs://other'], issued_at, signature)
+        self.assertEqual(response.status_code, 403)
+
+    def test_expired_signature_is_rejected(self):
+        response = self.post(self.wallet.address, ['ipfs://one'], issued_at=int(time.time()) - 3600)
+        self.assertEqual(response.status_code, 401)
+
+    def test_missing_signature_is_rejected(self):
+        response = self.client.post('/api/files/relay/', {
+            'owner': self.wallet.address, 'uris': ['ipfs://one'],
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(RELAYER_USER_HOURLY_LIMIT=2)
+    def test_hourly_limit(self):
+        self.assertEqual(self.post(self.wallet.address, ['ipfs://one', 'ipfs://two']).status_code, 202)
+        response = self.post(self.wallet.address, ['ipfs://three'])
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '3600')
+
+
+@override_settings(UPLOAD_MAX_OPEN_SESSIONS=2)
+class UploadSessionLimitTests(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, ignore_errors=True)
+        override = override_settings(UPLOAD_TEMP_DIR=self.temp_dir)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.user = User(username='alice', email='alice@example.com')
+        self.user.set_password('Passw0rd')
+        self.user.save()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + generate_token(self.user.id, self.user.email))
+
+    def start(self):
+        return self.client.post('/api/files/uploads/', {'filename': 'a.bin', 'size': 10}, format='json')
+
+    def expire(self, upload_id):
+        UploadSession.objects.filter(id=upload_id).update(
+            updated_at=timezone.now() - datetime.timedelta(seconds=settings.UPLOAD_SESSION_TTL + 1),
+        )
+
+    def test_declared_content_type_is_normalized(self):
+        response = self.client.post('/api/files/uploads/', {
+            'filename': 'a.html', 'size': 10, 'content_type': 'text/html\r\nX-Evil: 1',
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(UploadSession.objects.get().content_type, 'application/octet-stream')
+
+    def test_open_sessions_are_capped_per_user(self):
+        self.assertEqual(self.start().status_code, 201)
+        first = self.start()
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(self.start().status_code, 429)
+
+        # Abandoned uploads no longer count against the limit
+        self.expire(first.data['upload_id'])
+        self.assertEqual(self.start().status_code, 201)
+
+    def test_expired_upload_is_gone(self):
+        upload_id = self.start().data['upload_id']
+        self.expire(upload_id)
+        response = self.client.put(f'/api/files/uploads/{upload_id}/', b'0123456789',
+                                   content_type='application/octet-stream', HTTP_UPLOAD_OFFSET='0')
+        self.assertEqual(response.status_code, 410)
+
+    def test_purge_removes_expired_sessions_and_partial_files(self):
+        stale = UploadSession.objects.get(id=self.start().data['upload_id'])
+        fresh = UploadSession.objects.get(id=self.start().data['upload_id'])
+        self.expire(stale.id)
+
+        self.assertEqual(uploads.purge_expired(), 1)
+        self.assertFalse(UploadSession.objects.filter(id=stale.id).exists())
+        self.assertFalse(os.path.exists(uploads.partial_path(stale)))
+        self.assertTrue(os.path.exists(uploads.partial_path(fresh)))
+
+
+class DedupTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create(username='alice', email='alice@example.com', password='x')
+        self.bob = User.objects.create(username='bob', email='bob@example.com', password='x')
+        self.stored_file = dedup.register('a' * 64, 'b' * 64, 3, 'bafycontent')
+        storage = mock.patch('files.dedup.get_storage')
+        self.storage = storage.start().return_value
+        self.addCleanup(storage.stop)
+
+    def test_content_is_deleted_with_its_last_owner(self):
+        dedup.add_owner(self.stored_file, self.alice, 'a.png')
+        dedup.add_owner(self.stored_file, self.bob, 'b.png')
+
+        FileOwner.objects.get(user=self.alice).delete()
+        self.assertEqual(StoredFile.objects.get().ref_count, 1)
+        self.storage.delete.assert_not_called()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            FileOwner.objects.get(user=self.bob).delete()
+            self.storage.delete.assert_not_called()
+        self.assertFalse(StoredFile.objects.exists())
+        self.storage.delete.assert_called_once_with('bafycontent')
+
+    def test_content_survives_a_rolled_back_release(self):
+        dedup.add_owner(self.stored_file, self.alice, 'a.png')
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    FileOwner.objects.get().delete()
+                    raise RuntimeError('batch failed')
+            except RuntimeError:
+                pass
+
+        self.assertEqual(StoredFile.objects.get().ref_count, 1)
+        self.storage.delete.assert_not_called()
+
+    def test_content_recorded_on_chain_is_kept(self):
+        dedup.add_owner(self.stored_file, self.alice, 'a.png')
+        relayer.enqueue(self.alice, OWNER, ['ipfs://bafycontent'])
+
+        FileOwner.objects.get().delete()
+        self.assertEqual(StoredFile.objects.get().ref_count, 0)
+        self.storage.delete.assert_not_called()
+        # Still found for later uploads of the same bytes
+        self.assertIsNotNone(dedup.add_owner(dedup.find('a' * 64), self.bob, 'b.png'))
+
+    def test_add_owner_after_release_returns_none(self):
+        stale = dedup.find('a' * 64)
+        dedup.add_owner(self.stored_file, self.alice, 'a.png')
+        FileOwner.objects.get().delete()
+
+        self.assertIsNone(dedup.add_owner(stale, self.bob, 'b.png'))
+        self.assertFalse(FileOwner.objects.exists())
+
+
+class CheckContentTests(TestCase):
+    def setUp(self):
+        user = User.objects.create(username='alice', email='alice@example.com', password='x')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + generate_token(user.id, user.email))
+
+    def test_each_hash_is_validated(self):
+        response = self.client.post('/api/files/check/', {
+            'size': 3, 'sha256': 'not-a-digest', 'partial_sha256': 'b' * 64,
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('sha256', response.data['error'])
+
+    def test_partial_hash_alone(self):
+        response = self.client.post('/api/files/check/', {'size': 3, 'partial_sha256': 'b' * 64}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.data['candidate'])
+
+
+class _UpstreamHandler(BaseHTTPRequestHandler):
+    """
+    Serves len(cid) * 1000 bytes for any CID; a CID starting with 'slow' trickles it out
+    and one starting with 'html' or 'png' is labelled with that type
+    """
+    types = {'html': 'text/html; charset=utf-8', 'png': 'image/png'}
+
+    def do_GET(self):
+        cid = self.path.rsplit('/', 1)[-1]
+        body = b'x' * (len(cid) * 1000)
+        self.send_response(200)
+        self.send_header('Content-Type', next(
+            (value for prefix, value in self.types.items() if cid.startswith(prefix)), 'application/octet-stream',
+        ))
+        if not cid.startswith('chunked'):
+            self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        pieces = 6 if cid.startswith('slow') else 1
+        for i in range(pieces):
+            if cid.startswith('slow'):
+                time.sleep(0.05)
+            self.wfile.write(body[i * len(body) // pieces:(i + 1) * len(body) // pieces])
+            self.wfile.flush()
+
+    def log_message(self, *args):
+        pass
+
+
+class GatewayTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), _UpstreamHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir, ignore_errors=True)
+        override = override_settings(
+            GATEWAY_UPSTREAM_URL=f'http://127.0.0.1:{self.server.server_port}/ipfs/',
+            GATEWAY_CACHE_DIR=cache_dir,
+            GATEWAY_MAX_OBJECT_SIZE=50 * 1000,
+            UPLOAD_STORAGE_ROOT=cache_dir,
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_object_within_limit_is_cached(self):
+        cid = 'b' * 46
+        path = gateway.get(cid)
+        self.assertEqual(os.path.getsize(path), 46 * 1000)
+
+    def test_declared_oversize_object_is_refused(self):
+        with self.assertRaises(gateway.GatewayError):
+            gateway.get('b' * 60)
+        self.assertFalse(os.path.exists(gateway.cache_path('b' * 60)))
+
+    def test_undeclared_oversize_object_is_cut_off(self):
+        cid = 'chunked' + 'b' * 53
+        with self.assertRaises(gateway.GatewayError):
+            gateway.get(cid)
+        self.assertFalse(os.path.exists(gateway.cache_path(cid)))
+        self.assertEqual(os.listdir(os.path.dirname(gateway.cache_path(cid))), [])
+
+    @override_settings(GATEWAY_TIMEOUT=0.15)
+    def test_followers_wait_for_the_whole_download(self):
+        cid = 'slow' + 'b' * 42
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(gateway.get(cid))) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [gateway.cache_path(cid)] * 3)
+
+    def test_asgi_responses_stream_without_buffering(self):
+        cid = 'b' * 46
+        gateway.get(cid)
+
+        async def fetch(headers=None):
+            response = await AsyncClient().get(f'/api/files/ipfs/{cid}', headers=headers)
+            # An async body is sent block by block rather than collected into a list first
+            self.assertTrue(response.is_async)
+            return response, b''.join([part async for part in response])
+
+        response, body = async_to_sync(fetch)()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(body), 46 * 1000)
+        self.assertEqual(response['Content-Length'], str(46 * 1000))
+
+        response, body = async_to_sync(fetch)({'Range': 'bytes=10-19'})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(body, b'x' * 10)
+
+    def test_only_raster_images_are_served_inline(self):
+        response = self.client.get('/api/files/ipfs/' + 'html' + 'b' * 42)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/html')
+        self.assertTrue(response['Content-Disposition'].startswith('attachment'))
+        self.assertEqual(response['Content-Security-Policy'], 'sandbox')
+        self.assertEqual(response['X-Content-Type-Options'], 'nosniff')
+
+        response = self.client.get('/api/files/ipfs/' + 'png' + 'b' * 43, HTTP_RANGE='bytes=0-9')
+        self.assertEqual(response.status_code, 206)
+        self.assertTrue(response['Content-Disposition'].startswith('inline'))
+        self.assertEqual(response['Content-Security-Policy'], 'sandbox')
+
+    def test_content_types_are_normalized(self):
+        self.assertEqual(gateway.normalize_content_type('Image/PNG; charset=x'), 'image/png')
+        self.assertEqual(gateway.normalize_content_type('text/html\r\nX-Evil: 1'), 'application/octet-stream')
+        self.assertEqual(gateway.normalize_content_type(''), 'application/octet-stream')
+
+
+class ThumbnailTests(TestCase):
+    def setUp(self):
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir, ignore_errors=True)
+        override = override_settings(THUMBNAIL_DIR=temp_dir, THUMBNAIL_WORKERS=1)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.source = os.path.join(temp_dir, 'source.png')
+        Image.new('RGB', (600, 400), 'red').save(self.source)
+        fetch = mock.patch('files.thumbnails.gateway.get', return_value=self.source)
+        fetch.start()
+        self.addCleanup(fetch.stop)
+
+    def tearDown(self):
+        if thumbnails._pool is not None:
+            thumbnails._discard_pool(thumbnails._pool)
+
+    def test_pool_is_replaced_after_a_worker_dies(self):
+        pool = thumbnails._get_pool()
+        pool.submit(int).result()
+        for process in list(pool._processes.values()):
+            process.kill()
+            process.join()
+
+        path = thumbnails.ensure('b' * 46, 'thumb')
+
+        with Image.open(path) as image:
+            self.assertEqual(image.size, (256, 171))
+        self.assertIsNot(thumbnails._get_pool(), pool)
+
+
+class ListFilesTests(TestCase):
+    def test_limit_is_clamped(self):
+        user = User.objects.create(username='alice', email='alice@example.com', password='x')
+        stored_file = dedup.register('a' * 64, 'b' * 64, 3, 'bafycontent')
+        dedup.add_owner(stored_file, user, 'a.bin')
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Bearer ' + generate_token(user.id, user.email))
+
+        for limit in ('0', '-5'):
+            response = client.get('/api/files/', {'limit': limit})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data['files']), 1)
@@ -0,0 +1,163 @@
+"""
+Thumbnail and preview generation
+
+Images are resized in a process pool so the work neither holds the GIL nor
+blocks request threads. Results are stored per CID and size; since a CID's
+content never changes, a rendered thumbnail is valid forever.
+"""
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+
+from . import gateway
+from .imaging import render_thumbnail
+
+logger = logging.getLogger(__name__)
+
+
+class ThumbnailError(Exception):
+    def __init__(self, message, status=415):
+        super().__init__(message)
+        self.status = status
+
+
+_pool = None
+_scheduler = None
+_pool_lock = threading.Lock()
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool, _scheduler
+    with _pool_lock:
+        if _pool is None:
+            # Spawned workers import only files.imaging, never the Django project
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        if _scheduler is None:
+            _scheduler = ThreadPoolExecutor(max_workers=settings.THUMBNAIL_WORKERS)
+        return _pool
+
+
+def _discard_pool(broken):
+    """Drop a pool whose worker died so the next submit starts a fresh one"""
+    global _pool
+    with _pool_lock:
+        if _pool is broken:
+            _pool = None
+    broken.shutdown(wait=False)
+
+
+def thumbnail_path(cid, size_name):
+    return os.path.join(settings.THUMBNAIL_DIR, size_name, cid[-2:], f'{cid}.webp')
+
+
+def thumbnail_urls(cid):
+    """URLs for every configured size of a CID"""
+    return {
+        size_name: f'/api/files/thumbnails/{size_name}/{cid}'
+        for size_name in settings.THUMBNAIL_SIZES
+    }
+
+
+def ensure(cid, size_name):
+    """
+    Return the path of a rendered thumbnail, generating it if needed
+    Concurrent calls for the same CID and size wait on a single render
+    """
+    path = thumbnail_path(cid, size_name)
+    if os.path.exists(path):
+        return path
+
+    key = (cid, size_name)
+    with _inflight_lock:
+        future = _inflight.get(key)
+        leader = future is None
+        if leader:
+            future = _inflight[key] = Future()
+
+    if leader:
+        _render(cid, size_name, path, future)
+
+    try:
+        return future.result(timeout=settings.THUMBNAIL_TIMEOUT)
+    except gateway.GatewayError as e:
+        raise ThumbnailError(str(e), status=e.status)
+    except TimeoutError:
+        raise ThumbnailError('Thumbnail rendering timed out', status=504)
+    except Exception as e:
+        raise ThumbnailError(f'Could not render thumbnail: {e}')
+
+
+def _render(cid, size_name, path, future):
+    """Fetch the source and hand it to the pool, resolving future with the result"""
+    key = (cid, size_name)
+
+    def fail(e):
+        with _inflight_lock:
+            _inflight.pop(key, None)
+        future.set_exception(e)
+
+    def submit(src_path, retry):
+        pool = _get_pool()
+        try:
+            render_future = pool.submit(
+                render_thumbnail, src_path, path,
+                settings.THUMBNAIL_SIZES[size_name], settings.THUMBNAIL_QUALITY,
+            )
+        except BrokenProcessPool as e:
+            _discard_pool(pool)
+            if not retry:
+                raise
+            logger.warning("Thumbnail pool was broken, restarting it: %s", e)
+            return submit(src_path, retry=False)
+
+        def finish(render_future):
+            e = render_future.exception()
+            if isinstance(e, BrokenProcessPool):
+                # A worker died (e.g. killed for memory); retry once on a fresh pool
+                _discard_pool(pool)
+                if retry:
+                    logger.warning("Thumbnail worker died rendering %s, retrying: %s", cid, e)
+                    try:
+                        submit(src_path, retry=False)
+                    except Exception as e:
+                        fail(e)
+                    return
+            if e is not None:
+                fail(e)
+            else:
+                with _inflight_lock:
+                    _inflight.pop(key, None)
+                future.set_result(render_future.result())
+
+        render_future.add_done_callback(finish)
+
+    try:
+        src_path = gateway.get(cid)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        submit(src_path, retry=True)
+    except Exception as e:
+        fail(e)
+
+
+def _ensure_all(cid):
+    for size_name in settings.THUMBNAIL_SIZES:
+        try:
+            ensure(cid, size_name)
+        except ThumbnailError as e:
+            logger.warning("Thumbnail %s for %s failed: %s", size_name, cid, e)
+
+
+def schedule(cid):
+    """Render every size for a CID in the background"""
+    _get_pool()
+    _scheduler.submit(_ensure_all, cid)
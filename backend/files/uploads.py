@@ -0,0 +1,193 @@
+"""
+Resumable, streaming uploads
+
+Each chunk is read from the request in fixed-size blocks, appended to a
+partial file on disk and fed into a running SHA-256 as it arrives, so the
+memory used per upload does not depend on the size of the file.
+"""
+import datetime
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from . import dedup, thumbnails
+from .models import UploadSession
+from .storage import get_storage
+
+READ_SIZE = 64 * 1024
+MAX_CACHED_HASHERS = 256
+
+
+class UploadConflict(Exception):
+    """Raised when a chunk does not line up with the server's offset or the upload is busy"""
+
+
+# Running hashes for uploads in progress in this process, keyed by upload id.
+# A different worker (or a restart) rebuilds the hash from the partial file.
+_hashers = OrderedDict()
+_hashers_lock = threading.Lock()
+
+
+def partial_path(session):
+    return os.path.join(settings.UPLOAD_TEMP_DIR, f'{session.id}.part')
+
+
+def _get_hasher(session, path):
+    with _hashers_lock:
+        entry = _hashers.pop(str(session.id), None)
+    if entry is not None and entry[0] == session.offset:
+        return entry[1]
+
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        remaining = session.offset
+        while remaining:
+            block = f.read(min(READ_SIZE, remaining))
+            if not block:
+                break
+            hasher.update(block)
+            remaining -= len(block)
+    return hasher
+
+
+def _put_hasher(session, hasher):
+    with _hashers_lock:
+        _hashers[str(session.id)] = (session.offset, hasher)
+        while len(_hashers) > MAX_CACHED_HASHERS:
+            _hashers.popitem(last=False)
+
+
+def _acquire(session, offset):
+    """Claim the upload for one writer, provided the client's offset matches ours"""
+    now = timezone.now()
+    claimed = UploadSession.objects.filter(
+        Q(locked_until__isnull=True) | Q(locked_until__lt=now),
+        id=session.id,
+        offset=offset,
+        status=UploadSession.STATUS_UPLOADING,
+    ).update(locked_until=now + datetime.timedelta(seconds=settings.UPLOAD_LOCK_TIMEOUT))
+    if not claimed:
+        session.refresh_from_db()
+        raise UploadConflict(f'Upload is busy or expected offset {session.offset}')
+
+
+def _expiry_cutoff():
+    return timezone.now() - datetime.timedelta(seconds=settings.UPLOAD_SESSION_TTL)
+
+
+def is_expired(session):
+    """An unfinished upload that has not received a chunk for UPLOAD_SESSION_TTL is abandoned"""
+    return session.status == UploadSession.STATUS_UPLOADING and session.updated_at < _expiry_cutoff()
+
+
+def open_session_count(user):
+    return UploadSession.objects.filter(
+        user=user, status=UploadSession.STATUS_UPLOADING, updated_at__gte=_expiry_cutoff(),
+    ).count()
+
+
+def purge_expired():
+    """Delete abandoned uploads and their partial files; returns the number removed"""
+    now = timezone.now()
+    expired = UploadSession.objects.filter(
+        Q(locked_until__isnull=True) | Q(locked_until__lt=now),
+        status=UploadSession.STATUS_UPLOADING,
+        updated_at__lt=_expiry_cutoff(),
+    )
+    removed = 0
+    for session in expired.iterator():
+        # Deleting the row first means a late chunk gets a 404 rather than recreating the file;
+        # the post_delete handler then removes the partial file
+        if UploadSession.objects.filter(id=session.id, status=UploadSession.STATUS_UPLOADING).delete()[0]:
+            removed += 1
+    return removed
+
+
+def discard_partial(session):
+    """Drop the cached hash and partial file of a deleted upload"""
+    with _hashers_lock:
+        _hashers.pop(str(session.id), None)
+    try:
+        os.remove(partial_path(session))
+    except FileNotFoundError:
+        pass
+
+
+def create_session(user, filename, size, content_type=''):
+    session = UploadSession.objects.create(
+        user=user, filename=filename, size=size, content_type=content_type,
+    )
+    os.makedirs(settings.UPLOAD_TEMP_DIR, exist_ok=True)
+    open(partial_path(session), 'wb').close()
+    return session
+
+
+def append_chunk(session, stream, offset, length):
+    """
+    Stream up to length bytes from stream onto the upload at offset
+    Completes the upload once every byte has arrived
+    """
+    if offset + length > session.size:
+        raise UploadConflict('Chunk extends past the declared upload size')
+
+    _acquire(session, offset)
+    path = partial_path(session)
+    try:
+        hasher = _get_hasher(session, path)
+        with open(path, 'r+b') as f:
+            # Drop any bytes a crashed writer left past the recorded offset
+            f.truncate(offset)
+            f.seek(offset)
+            remaining = length
+            try:
+                while remaining:
+                    block = stream.read(min(READ_SIZE, remaining))
+                    if not block:
+                        break
+                    f.write(block)
+                    hasher.update(block)
+                    remaining -= len(block)
+            finally:
+                # Keep whatever arrived before a disconnect so the client can resume
+                f.flush()
+                session.offset = offset + (length - remaining)
+                _put_hasher(session, hasher)
+
+        if session.offset == session.size:
+            _complete(session, hasher.hexdigest())
+    finally:
+        session.locked_until = None
+        session.save(update_fields=['offset', 'status', 'sha256', 'cid', 'locked_until',
+                                    'completed_at', 'updated_at'])
+
+    return session
+
+
+def _complete(session, sha256):
+    with _hashers_lock:
+        _hashers.pop(str(session.id), None)
+
+    path = partial_path(session)
+    stored_file = dedup.find(sha256, session.size)
+    if stored_file is not None and dedup.add_owner(stored_file, session.user, session.filename) is not None:
+        # Someone already uploaded these bytes; skip storing and pinning them again
+        os.remove(path)
+    else:
+        partial_sha256 = dedup.partial_hash(path)
+        cid = get_storage().store(path, sha256, session.filename, session.content_type)
+        stored_file = dedup.register(sha256, partial_sha256, session.size, cid, session.content_type)
+        if dedup.add_owner(stored_file, session.user, session.filename) is None:
+            raise UploadConflict('Stored content was removed while completing the upload, retry the last chunk')
+
+    session.sha256 = sha256
+    session.cid = stored_file.cid
+    session.status = UploadSession.STATUS_COMPLETE
+    session.completed_at = timezone.now()
+
+    if session.content_type.startswith('image/'):
+        thumbnails.schedule(stored_file.cid)
@@ -0,0 +1,16 @@
+"""
+URL configuration for files app
+"""
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('', views.list_files, name='list_files'),
+    path('relay/', views.relay_add, name='relay_add'),
+    path('relay/status/', views.relay_status, name='relay_status'),
+    path('check/', views.check_content, name='check_content'),
+    path('uploads/', views.create_upload, name='create_upload'),
+    path('uploads/<uuid:upload_id>/', views.upload_detail, name='upload_detail'),
+    path('ipfs/<str:cid>', views.ipfs_gateway, name='ipfs_gateway'),
+    path('thumbnails/<str:size_name>/<str:cid>', views.thumbnail, name='thumbnail'),
+]
@@ -0,0 +1,550 @@
+"""
+File API Views
+"""
+import io
+import os
+import re
+import time
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+from rest_framework import status
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_http_methods
+from audit import events as audit
+from blockshare import streaming
+from authentication.models import User
+from authentication.jwt_utils import get_request_payload
+from .models import FileOwner, PendingAdd, UploadSession
+from . import dedup, gateway, relayer, thumbnails, uploads
+from .tasks import schedule_flush, schedule_upload_purge
+
+ADDRESS_REGEX = r'^0x[a-fA-F0-9]{40}$'
+SHA256_REGEX = r'^[a-f0-9]{64}$'
+
+
+def get_request_user(request):
+    """
+    Resolve the user for a Bearer token
+    Returns: (user, error_response)
+    """
+    is_valid, payload_or_error = get_request_payload(request)
+    if not is_valid:
+        return None, Response({
+            'success': False,
+            'error': payload_or_error
+        }, status=status.HTTP_401_UNAUTHORIZED)
+
+    try:
+        return User.objects.get(id=payload_or_error.get('user_id'), is_active=True), None
+    except User.DoesNotExist:
+        return None, Response({
+            'success': False,
+            'error': 'User not found'
+        }, status=status.HTTP_404_NOT_FOUND)
+
+
+@api_view(['POST'])
+def relay_add(request):
+    """
+    Queue ipfs:// URIs to be added on-chain by the relayer
+
+    The relayer pays for the transaction, so the owner wallet must sign the
+    request: signature is an EIP-191 personal_sign of relayer.relay_message()
+    made within RELAYER_SIGNATURE_MAX_AGE seconds of issued_at.
+
+    Expected header: Authorization: Bearer <token>
+    Expected JSON payload:
+    {
+        "owner": "0x...",
+        "uris": ["ipfs://...", ...],
+        "issued_at": 1700000000,
+        "signature": "0x..."
+    }
+    """
+    try:
+        user, error_response = get_request_user(request)
+        if error_response:
+            return error_response
+
+        owner = request.data.get('owner', '').strip()
+        uris = request.data.get('uris')
+        if uris is None and request.data.get('uri'):
+            uris = [request.data.get('uri')]
+
+        # Validate required fields
+        if not owner or not uris or not isinstance(uris, list):
+            return Response({
+                'success': False,
+                'error': 'Owner and uris are required'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        if not re.match(ADDRESS_REGEX, owner):
+            return Response({
+                'success': False,
+                'error': 'Invalid owner address'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        if len(uris) > settings.RELAYER_MAX_BATCH_SIZE:
+            return Response({
+                'success': False,
+                'error': f'At most {settings.RELAYER_MAX_BATCH_SIZE} uris per request'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        if not all(isinstance(uri, str) and uri.startswith('ipfs://') and len(uri) <= 255 for uri in uris):
+            return Response({
+                'success': False,
+                'error': 'Each uri must be an ipfs:// URI'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            issued_at = int(request.data.get('issued_at'))
+        except (TypeError, ValueError):
+            issued_at = None
+        signature = request.data.get('signature')
+        if issued_at is None or not isinstance(signature, str) or not signature:
+            return Response({
+                'success': False,
+                'error': 'issued_at and a wallet signature are required'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        if abs(time.time() - issued_at) > settings.RELAYER_SIGNATURE_MAX_AGE:
+            return Response({
+                'success': False,
+                'error': 'Signature has expired, sign the request again'
+            }, status=status.HTTP_401_UNAUTHORIZED)
+
+        if not relayer.verify_signature(owner, uris, issued_at, signature):
+            return Response({
+                'success': False,
+                'error': 'Signature was not made by the owner wallet'
+            }, status=status.HTTP_403_FORBIDDEN)
+
+        if relayer.recent_count(user) + len(uris) > settings.RELAYER_USER_HOURLY_LIMIT:
+            response = Response({
+                'success': False,
+                'error': f'At most {settings.RELAYER_USER_HOURLY_LIMIT} uris per hour'
+            }, status=status.HTTP_429_TOO_MANY_REQUESTS)
+            response['Retry-After'] = '3600'
+            return response
+
+        items = relayer.enqueue(user, owner, uris)
+        schedule_flush()
+        audit.emit(audit.RELAY_ADD, user.id, request, owner=owner.lower(), uris=uris)
+
+        return Response({
+            'success': True,
+            'items': [item.to_dict() for item in items]
+        }, status=status.HTTP_202_ACCEPTED)
+
+    except Exception as e:
+        return Response({
+            'success': False,
+            'error': f'Relay request failed: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['GET'])
+def relay_status(request):
+    """
+    Report per-item confirmation for queued adds
+
+    Expected header: Authorization: Bearer <token>
+    Query parameters: ids=1,2,3
+    """
+    try:
+        user, error_response = get_request_user(request)
+        if error_response:
+            return error_response
+
+        try:
+            ids = [int(i) for i in request.query_params.get('ids', '').split(',') if i]
+        except ValueError:
+            return Response({
+                'success': False,
+                'error': 'ids must be a comma separated list of integers'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        items = PendingAdd.objects.filter(user=user, id__in=ids)
+
+        return Response({
+            'success': True,
+            'items': [item.to_dict() for item in items]
+        }, status=status.HTTP_200_OK)
+
+    except Exception as e:
+        return Response({
+            'success': False,
+            'error': f'Relay status failed: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['POST'])
+def create_upload(request):
+    """
+    Start a resumable upload
+
+    Expected header: Authorization: Bearer <token>
+    Expected JSON payload:
+    {
+        "filename": "string",
+        "size": 12345,
+        "content_type": "image/png"
+    }
+    """
+    try:
+        user, error_response = get_request_user(request)
+        if error_response:
+            return error_response
+
+        filename = os.path.basename(str(request.data.get('filename', '')).strip())
+        filename = re.sub(r'["\\\r\n]', '', filename)[:255]
+        content_type = gateway.normalize_content_type(request.data.get('content_type'))
+        size = request.data.get('size')
+
+        # Validate required fields
+        if not filename or size is None:
+            return Response({
+                'success': False,
+                'error': 'Filename and size are required'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            size = int(size)
+        except (TypeError, ValueError):
+            size = -1
+        if size < 0 or size > settings.UPLOAD_MAX_SIZE:
+            return Response({
+                'success': False,
+                'error': f'Size must be between 0 and {settings.UPLOAD_MAX_SIZE} bytes'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        if uploads.open_session_count(user) >= settings.UPLOAD_MAX_OPEN_SESSIONS:
+            return Response({
+                'success': False,
+                'error': f'At most {settings.UPLOAD_MAX_OPEN_SESSIONS} unfinished uploads at a time; '
+                         f'finish or abandon one first'
+            }, status=status.HTTP_429_TOO_MANY_REQUESTS)
+
+        session = uploads.create_session(user, filename, size, content_type)
+        schedule_upload_purge()
+
+        return Response({
+            'success': True,
+            'chunk_size': settings.UPLOAD_CHUNK_SIZE,
+            **session.to_dict()
+        }, status=status.HTTP_201_CREATED)
+
+    except Exception as e:
+        return Response({
+            'success': False,
+            'error': f'Upload creation failed: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['GET', 'PUT'])
+def upload_detail(request, upload_id):
+    """
+    GET: report the offset to resume an upload from
+    PUT: append the raw request body to the upload
+
+    Expected header: Authorization: Bearer <token>
+    Expected header (PUT): Upload-Offset: <bytes already uploaded>
+    """
+    try:
+        user, error_response = get_request_user(request)
+        if error_response:
+            return error_response
+
+        try:
+            session = UploadSession.objects.get(id=upload_id, user=user)
+        except UploadSession.DoesNotExist:
+            return Response({
+                'success': False,
+                'error': 'Upload not found'
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        if uploads.is_expired(session):
+            return Response({
+                'success': False,
+                'error': 'Upload has expired, start a new one'
+            }, status=status.HTTP_410_GONE)
+
+        if request.method == 'GET':
+            return Response({
+                'success': True,
+                **session.to_dict()
+            }, status=status.HTTP_200_OK)
+
+        if session.status == UploadSession.STATUS_COMPLETE:
+            return Response({
+                'success': True,
+                **session.to_dict()
+            }, status=status.HTTP_200_OK)
+
+        try:
+            offset = int(request.headers.get('Upload-Offset', ''))
+            length = int(request.headers.get('Content-Length') or 0)
+        except ValueError:
+            return Response({
+                'success': False,
+                'error': 'Upload-Offset and Content-Length headers are required'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            # Read the body straight from the socket rather than through request.data
+            stream = request.stream or io.BytesIO()
+            uploads.append_chunk(session, stream, offset, length)
+            if session.status == UploadSession.STATUS_COMPLETE:
+                audit.emit(audit.UPLOAD, user.id, request, cid=session.cid, size=session.size,
+                           filename=session.filename)
+        except uploads.UploadConflict as e:
+            return Response({
+                'success': False,
+                'error': str(e),
+                **session.to_dict()
+            }, status=status.HTTP_409_CONFLICT)
+
+        return Response({
+            'success': True,
+            **session.to_dict()
+        }, status=status.HTTP_200_OK)
+
+    except Exception as e:
+        return Response({
+            'success': False,
+            'error': f'Upload failed: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['POST'])
+def check_content(request):
+    """
+    Check whether content already exists before uploading it
+
+    Send the partial hash first; only if it reports a candidate does the
+    client need to hash the whole file. A full hash match makes the caller
+    an owner of the existing content, so the upload can be skipped.
+
+    Expected header: Authorization: Bearer <token>
+    Expected JSON payload:
+    {
+        "size": 12345,
+        "partial_sha256": "hex",  (SHA-256 of the first partial_hash_bytes)
+        "sha256": "hex",          (optional, SHA-256 of the whole file)
+        "filename": "string"      (optional)
+    }
+    """
+    try:
+        user, error_response = get_request_user(request)
+        if error_response:
+            return error_response
+
+        sha256 = str(request.data.get('sha256', '')).lower()
+        partial_sha256 = str(request.data.get('partial_sha256', '')).lower()
+        try:
+            size = int(request.data.get('size'))
+        except (TypeError, ValueError):
+            return Response({
+                'success': False,
+                'error': 'Size is required'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        if not sha256 and not partial_sha256:
+            return Response({
+                'success': False,
+                'error': 'A sha256 or partial_sha256 hex digest is required'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        for field, value in (('sha256', sha256), ('partial_sha256', partial_sha256)):
+            if value and not re.match(SHA256_REGEX, value):
+                return Response({
+                    'success': False,
+                    'error': f'{field} must be a hex SHA-256 digest'
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+        if sha256:
+            stored_file = dedup.find(sha256, size)
+            filename = os.path.basename(str(request.data.get('filename', '')))[:255]
+            if stored_file is not None and dedup.add_owner(stored_file, user, filename) is not None:
+                audit.emit(audit.UPLOAD, user.id, request, cid=stored_file.cid, size=size, deduplicated=True)
+                return Response({
+                    'success': True,
+                    'exists': True,
+                    'cid': stored_file.cid
+                }, status=status.HTTP_200_OK)
+
+            return Response({
+                'success': True,
+                'exists': False
+            }, status=status.HTTP_200_OK)
+
+        return Response({
+            'success': True,
+            'exists': False,
+            'candidate': dedup.has_candidate(partial_sha256, size),
+            'partial_hash_bytes': settings.PARTIAL_HASH_BYTES
+        }, status=status.HTTP_200_OK)
+
+    except Exception as e:
+        return Response({
+            'success': False,
+            'error': f'Content check failed: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@require_http_methods(['GET', 'HEAD'])
+def ipfs_gateway(request, cid):
+    """
+    Serve IPFS content through the local caching proxy
+
+    Supports single byte ranges (Range: bytes=start-end) and conditional
+    requests; the ETag is the CID itself since the content can never change.
+    """
+    if not gateway.is_valid_cid(cid):
+        return JsonResponse({
+            'success': False,
+            'error': 'Invalid CID'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    etag = f'"{cid}"'
+    cache_headers = {
+        'ETag': etag,
+        'Cache-Control': f'public, max-age={settings.GATEWAY_MAX_AGE}, immutable',
+        'Accept-Ranges': 'bytes',
+    }
+
+    if etag in [tag.strip() for tag in request.headers.get('If-None-Match', '').split(',')]:
+        response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+        for header, value in cache_headers.items():
+            response[header] = value
+        return response
+
+    try:
+        path = gateway.get(cid)
+    except gateway.GatewayError as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=e.status)
+
+    size = os.path.getsize(path)
+    content_type = gateway.content_type(cid, path)
+
+    byte_range = None
+    range_header = request.headers.get('Range')
+    # If-Range only ever matches our single strong ETag
+    if range_header and request.headers.get('If-Range', etag) == etag:
+        try:
+            byte_range = gateway.parse_range(range_header, size)
+        except ValueError:
+            response = HttpResponse(status=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    if byte_range is None:
+        response = streaming.file_response(request, path, content_type)
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            streaming.stream(request, streaming.iter_file(path, start, end - start + 1)),
+            status=status.HTTP_206_PARTIAL_CONTENT,
+            content_type=content_type,
+        )
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = str(end - start + 1)
+
+    for header, value in {**cache_headers, **gateway.content_headers(cid, content_type)}.items():
+        response[header] = value
+    return response
+
+
+@require_http_methods(['GET', 'HEAD'])
+def thumbnail(request, size_name, cid):
+    """
+    Serve a fixed-size WebP rendition of an image, rendering it on first request
+    """
+    if not gateway.is_valid_cid(cid) or size_name not in settings.THUMBNAIL_SIZES:
+        return JsonResponse({
+            'success': False,
+            'error': 'Unknown thumbnail'
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    etag = f'"{cid}-{size_name}"'
+    cache_headers = {
+        'ETag': etag,
+        'Cache-Control': f'public, max-age={settings.GATEWAY_MAX_AGE}, immutable',
+    }
+
+    if etag in [tag.strip() for tag in request.headers.get('If-None-Match', '').split(',')]:
+        response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        try:
+            path = thumbnails.ensure(cid, size_name)
+        except thumbnails.ThumbnailError as e:
+            return JsonResponse({
+                'success': False,
+                'error': str(e)
+            }, status=e.status)
+        response = streaming.file_response(request, path, 'image/webp')
+
+    for header, value in cache_headers.items():
+        response[header] = value
+    return response
+
+
+@api_view(['GET'])
+def list_files(request):
+    """
+    List the current user's files with thumbnail URLs
+
+    Expected header: Authorization: Bearer <token>
+    Query parameters: limit (default 50, max 200), before (id to page from)
+    """
+    try:
+        user, error_response = get_request_user(request)
+        if error_response:
+            return error_response
+
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', 50)), 200))
+            before = request.query_params.get('before')
+            before = int(before) if before else None
+        except ValueError:
+            return Response({
+                'success': False,
+                'error': 'limit and before must be integers'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        owners = FileOwner.objects.filter(user=user).select_related('stored_file').order_by('-id')
+        if before:
+            owners = owners.filter(id__lt=before)
+        owners = list(owners[:limit])
+
+        files = []
+        for owner in owners:
+            stored_file = owner.stored_file
+            is_image = stored_file.content_type.startswith('image/')
+            files.append({
+                'id': owner.id,
+                'filename': owner.filename,
+                'cid': stored_file.cid,
+                'uri': f'ipfs://{stored_file.cid}',
+                'size': stored_file.size,
+                'content_type': stored_file.content_type,
+                'url': f'/api/files/ipfs/{stored_file.cid}',
+                'thumbnails': thumbnails.thumbnail_urls(stored_file.cid) if is_image else {},
+                'created_at': owner.created_at,
+            })
+
+        return Response({
+            'success': True,
+            'files': files,
+            'next_before': owners[-1].id if len(owners) == limit else None
+        }, status=status.HTTP_200_OK)
+
+    except Exception as e:
+        return Response({
+            'success': False,
+            'error': f'Listing files failed: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -0,0 +1,9 @@
+from django.contrib import admin
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'status', 'attempts', 'available_at', 'created_at', 'finished_at')
+    list_filter = ('status', 'name')
+    readonly_fields = ('created_at', 'updated_at', 'finished_at', 'claim_token')
@@ -0,0 +1,82 @@
+"""
+Run background job workers
+"""
+import multiprocessing
+import signal
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+PURGE_INTERVAL = 60 * 60
+
+
+def work(stop, once=False):
+    """Worker loop: run due jobs until stop is set"""
+    from jobs.queue import purge_finished, run_next
+
+    last_purge = 0
+    while not stop.is_set():
+        close_old_connections()
+        if time.monotonic() - last_purge > PURGE_INTERVAL:
+            purge_finished()
+            last_purge = time.monotonic()
+
+        if not run_next():
+            if once:
+                return
+            stop.wait(settings.JOB_POLL_INTERVAL)
+
+
+def _child(stop):
+    import django
+    django.setup()
+    # The parent forwards shutdown through stop, letting the current job finish
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    work(stop)
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs in one or more worker processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=settings.JOB_WORKERS,
+                            help='Number of worker processes')
+        parser.add_argument('--once', action='store_true', help='Run every due job, then exit')
+
+    def handle(self, *args, **options):
+        if options['once']:
+            work(threading.Event(), once=True)
+            return
+
+        context = multiprocessing.get_context('spawn')
+        stop = context.Event()
+        stopping = []
+
+        def shutdown(signum, frame):
+            # Only flag it here; setting stop could deadlock with a wait() this handler interrupted
+            stopping.append(signum)
+
+        signal.signal(signal.SIGINT, shutdown)
+        signal.signal(signal.SIGTERM, shutdown)
+
+        workers = {}
+        self.stdout.write(f"Starting {options['workers']} job worker(s)")
+        while not stopping:
+            for i in range(options['workers']):
+                process = workers.get(i)
+                if process is None or not process.is_alive():
+                    if process is not None:
+                        self.stderr.write(f'Worker {process.pid} exited with {process.exitcode}, restarting')
+                    process = context.Process(target=_child, args=(stop,), name=f'job-worker-{i}', daemon=True)
+                    process.start()
+                    workers[i] = process
+            time.sleep(1)
+
+        self.stdout.write('Stopping workers after their current job')
+        stop.set()
+        for process in workers.values():
+            process.join()
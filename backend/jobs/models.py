@@ -0,0 +1,41 @@
+from django.db import models
+
+
+class Job(models.Model):
+    """A unit of background work, run by `manage.py run_jobs`"""
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    name = models.CharField(max_length=100)  # Registered handler name
+    payload = models.JSONField(default=dict)  # Keyword arguments for the handler
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    unique_key = models.CharField(max_length=100, blank=True)  # At most one queued job per key
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    # A queued job runs from this time; a running job is handed to another
+    # worker after it, in case the first one died (the visibility timeout)
+    available_at = models.DateTimeField()
+    claim_token = models.CharField(max_length=32, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'jobs'
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'available_at']),
+            models.Index(fields=['unique_key', 'status']),
+        ]
+
+    def __str__(self):
+        return f'{self.name} #{self.id} ({self.status})'
@@ -0,0 +1,126 @@
+"""
+Database-backed job queue
+
+Handlers are registered by name with @task in each app's tasks module, and
+jobs are queued with enqueue(). Workers (manage.py run_jobs) claim one job
+at a time with SELECT ... FOR UPDATE SKIP LOCKED, so any number of them can
+share the table without a broker. A claimed job is hidden from other
+workers for JOB_VISIBILITY_TIMEOUT seconds; if its worker dies it becomes
+claimable again after that. Failures are retried with exponential backoff
+up to the job's max_attempts. Handlers may therefore run more than once and
+must be idempotent.
+"""
+import datetime
+import logging
+import traceback
+import uuid
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+_handlers = {}
+
+
+def task(name):
+    """Register the decorated function as the handler for jobs called name"""
+    def register(func):
+        _handlers[name] = func
+        return func
+    return register
+
+
+def enqueue(name, payload=None, delay=0, max_attempts=None, unique_key=''):
+    """
+    Queue a job to run delay seconds from now
+    With a unique_key, returns the already queued job for that key instead of adding another
+    """
+    if unique_key:
+        existing = Job.objects.filter(unique_key=unique_key, status=Job.STATUS_QUEUED).first()
+        if existing is not None:
+            return existing
+    return Job.objects.create(
+        name=name,
+        payload=payload or {},
+        unique_key=unique_key,
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+        available_at=timezone.now() + datetime.timedelta(seconds=delay),
+    )
+
+
+def claim():
+    """Take the next due job, or return None if there is none"""
+    while True:
+        now = timezone.now()
+        with transaction.atomic():
+            job = (
+                Job.objects.select_for_update(skip_locked=True)
+                .filter(status__in=[Job.STATUS_QUEUED, Job.STATUS_RUNNING], available_at__lte=now)
+                .order_by('available_at', 'id')
+                .first()
+            )
+            if job is None:
+                return None
+
+            if job.status == Job.STATUS_RUNNING and job.attempts >= job.max_attempts:
+                # Its last attempt never reported back
+                job.status = Job.STATUS_FAILED
+                job.last_error = job.last_error or 'Visibility timeout expired'
+                job.finished_at = now
+                job.save(update_fields=['status', 'last_error', 'finished_at', 'updated_at'])
+                continue
+
+            job.status = Job.STATUS_RUNNING
+            job.attempts += 1
+            job.claim_token = uuid.uuid4().hex
+            job.available_at = now + datetime.timedelta(seconds=settings.JOB_VISIBILITY_TIMEOUT)
+            job.save(update_fields=['status', 'attempts', 'claim_token', 'available_at', 'updated_at'])
+            return job
+
+
+def _finish(job, **fields):
+    """Record the outcome, unless the job timed out and another worker has claimed it since"""
+    return Job.objects.filter(id=job.id, claim_token=job.claim_token).update(
+        updated_at=timezone.now(), **fields,
+    )
+
+
+def run(job):
+    """Run a claimed job; returns True if it succeeded"""
+    handler = _handlers.get(job.name)
+    try:
+        if handler is None:
+            raise LookupError(f'No handler registered for {job.name}')
+        handler(**job.payload)
+    except Exception:
+        logger.exception("Job %s failed (attempt %d of %d)", job, job.attempts, job.max_attempts)
+        now = timezone.now()
+        if job.attempts >= job.max_attempts:
+            _finish(job, status=Job.STATUS_FAILED, last_error=traceback.format_exc(), finished_at=now)
+        else:
+            delay = settings.JOB_RETRY_DELAY * 2 ** (job.attempts - 1)
+            _finish(job, status=Job.STATUS_QUEUED, last_error=traceback.format_exc(),
+                    available_at=now + datetime.timedelta(seconds=delay))
+        return False
+
+    _finish(job, status=Job.STATUS_DONE, finished_at=timezone.now())
+    return True
+
+
+def run_next():
+    """Claim and run one job; returns False if none was due"""
+    job = claim()
+    if job is None:
+        return False
+    run(job)
+    return True
+
+
+def purge_finished():
+    """Delete completed jobs older than JOB_RETENTION; failed jobs are kept for inspection"""
+    cutoff = timezone.now() - datetime.timedelta(seconds=settings.JOB_RETENTION)
+    return Job.objects.filter(status=Job.STATUS_DONE, finished_at__lt=cutoff).delete()[0]
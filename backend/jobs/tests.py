@@ -0,0 +1,143 @@
+import datetime
+import threading
+
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.utils import timezone
+
+from . import queue
+from .models import Job
+
+calls = []
+
+
+@queue.task('tests.record')
+def record(**payload):
+    calls.append(payload)
+
+
+@queue.task('tests.fail')
+def fail(**payload):
+    raise RuntimeError('boom')
+
+
+def make_due(job):
+    Job.objects.filter(id=job.id).update(available_at=timezone.now() - datetime.timedelta(seconds=1))
+
+
+@override_settings(JOB_VISIBILITY_TIMEOUT=300, JOB_RETRY_DELAY=10)
+class QueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_enqueue_claim_and_run(self):
+        job = queue.enqueue('tests.record', {'n': 1})
+        self.assertTrue(queue.run_next())
+        self.assertEqual(calls, [{'n': 1}])
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_DONE)
+        self.assertEqual(job.attempts, 1)
+        self.assertFalse(queue.run_next())
+
+    def test_delayed_job_is_not_claimed_early(self):
+        queue.enqueue('tests.record', delay=60)
+        self.assertIsNone(queue.claim())
+
+    def test_unique_key_deduplicates_queued_jobs(self):
+        first = queue.enqueue('tests.record', unique_key='flush')
+        self.assertEqual(queue.enqueue('tests.record', unique_key='flush').id, first.id)
+        queue.run_next()
+        # Once the first one ran, the key is free again
+        self.assertNotEqual(queue.enqueue('tests.record', unique_key='flush').id, first.id)
+
+    def test_claimed_job_is_hidden_until_the_visibility_timeout(self):
+        job = queue.enqueue('tests.record')
+        first = queue.claim()
+        self.assertEqual(first.id, job.id)
+        self.assertIsNone(queue.claim())
+
+        make_due(job)
+        second = queue.claim()
+        self.assertEqual(second.id, job.id)
+        self.assertEqual(second.attempts, 2)
+        self.assertNotEqual(second.claim_token, first.claim_token)
+
+    def test_finish_ignores_a_stale_claim(self):
+        job = queue.enqueue('tests.record')
+        stale = queue.claim()
+        make_due(job)
+        current = queue.claim()
+
+        queue.run(stale)  # The first worker finishes late
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_RUNNING)
+
+        queue.run(current)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_DONE)
+
+    def test_failures_back_off_exponentially(self):
+        job = queue.enqueue('tests.fail', max_attempts=3)
+        for attempt, delay in ((1, 10), (2, 20)):
+            before = timezone.now()
+            with self.assertLogs('jobs.queue', 'ERROR'):
+                self.assertFalse(queue.run(queue.claim()))
+            job.refresh_from_db()
+            self.assertEqual(job.status, Job.STATUS_QUEUED)
+            self.assertEqual(job.attempts, attempt)
+            self.assertIn('boom', job.last_error)
+            self.assertGreaterEqual(job.available_at, before + datetime.timedelta(seconds=delay))
+            self.assertLess(job.available_at, before + datetime.timedelta(seconds=delay + 5))
+            make_due(job)
+
+        with self.assertLogs('jobs.queue', 'ERROR'):
+            queue.run(queue.claim())
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_FAILED)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_lost_last_attempt_fails_the_job(self):
+        job = queue.enqueue('tests.record', max_attempts=1)
+        queue.claim()  # The worker dies without reporting back
+        make_due(job)
+
+        self.assertIsNone(queue.claim())
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_FAILED)
+        self.assertEqual(job.last_error, 'Visibility timeout expired')
+        self.assertEqual(calls, [])
+
+    def test_unknown_handler_fails(self):
+        job = queue.enqueue('tests.missing', max_attempts=1)
+        with self.assertLogs('jobs.queue', 'ERROR'):
+            queue.run(queue.claim())
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_FAILED)
+        self.assertIn('No handler registered', job.last_error)
+
+
+@skipUnlessDBFeature('has_select_for_update_skip_locked')
+class SkipLockedTests(TransactionTestCase):
+    def test_a_locked_job_is_skipped(self):
+        locked = queue.enqueue('tests.record')
+        free = queue.enqueue('tests.record')
+        claimed = []
+        ready, done = threading.Event(), threading.Event()
+
+        def hold_lock():
+            with transaction.atomic():
+                Job.objects.select_for_update().get(id=locked.id)
+                ready.set()
+                done.wait(5)
+            connection.close()
+
+        holder = threading.Thread(target=hold_lock)
+        holder.start()
+        ready.wait(5)
+        try:
+            claimed.append(queue.claim())
+        finally:
+            done.set()
+            holder.join()
+
+        self.assertEqual(claimed[0].id, free.id)
@@ -0,0 +1,73 @@
+"""
+Chain indexer for Upload contract events
+
+Reads FileAdded, AccessGranted and AccessRevoked logs in block ranges and
+stores them as ChainEvent rows, which the event stream then pushes to
+subscribed clients.
+"""
+from django.conf import settings
+from django.db import transaction
+
+from audit import events as audit
+from .models import ChainCursor, ChainEvent
+
+EVENT_TYPES = {
+    'FileAdded': ChainEvent.TYPE_FILE,
+    'AccessGranted': ChainEvent.TYPE_GRANT,
+    'AccessRevoked': ChainEvent.TYPE_REVOKE,
+}
+
+
+def _decode(contract, log):
+    from web3.exceptions import MismatchedABI
+
+    for name, event_type in EVENT_TYPES.items():
+        try:
+            decoded = getattr(contract.events, name)().process_log(log)
+        except MismatchedABI:
+            continue
+
+        args = decoded['args']
+        if event_type == ChainEvent.TYPE_FILE:
+            owner, user, url = args['user'], '', args['url'][:255]
+        else:
+            owner, user, url = args['owner'], args['user'].lower(), ''
+        return ChainEvent(
+            event_type=event_type,
+            owner=owner.lower(),
+            user=user,
+            url=url,
+            block_number=decoded['blockNumber'],
+            tx_hash=decoded['transactionHash'].hex(),
+            log_index=decoded['logIndex'],
+        )
+    return None
+
+
+def index_once(w3, contract):
+    """
+    Index the next range of confirmed blocks
+    Returns: (number of events stored, whether the indexer reached the chain head)
+    """
+    cursor, _ = ChainCursor.objects.get_or_create(contract_address=contract.address.lower())
+    head = w3.eth.block_number - settings.INDEXER_CONFIRMATIONS
+    start = cursor.block_number
+    if start > head:
+        return 0, True
+    end = min(head, start + settings.INDEXER_MAX_BLOCKS - 1)
+
+    logs = w3.eth.get_logs({'address': contract.address, 'fromBlock': start, 'toBlock': end})
+    events = [event for event in (_decode(contract, log) for log in logs) if event is not None]
+
+    with transaction.atomic():
+        ChainEvent.objects.bulk_create(events, ignore_conflicts=True)
+        cursor.block_number = end + 1
+        cursor.save(update_fields=['block_number', 'updated_at'])
+
+    for event in events:
+        if event.event_type in (ChainEvent.TYPE_GRANT, ChainEvent.TYPE_REVOKE):
+            audit.emit(
+                audit.GRANT if event.event_type == ChainEvent.TYPE_GRANT else audit.REVOKE,
+                owner=event.owner, grantee=event.user, tx_hash=event.tx_hash,
+            )
+    return len(events), end == head
@@ -0,0 +1,32 @@
+"""
+Index Upload contract events for the notification stream
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from files.relayer import connect
+from notifications.indexer import index_once
+
+
+class Command(BaseCommand):
+    help = 'Store FileAdded, AccessGranted and AccessRevoked events as they are mined'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=settings.INDEXER_POLL_INTERVAL,
+                            help='Seconds between polls once caught up')
+        parser.add_argument('--once', action='store_true', help='Index a single block range and exit')
+
+    def handle(self, *args, **options):
+        w3, contract = connect()
+        self.stdout.write(f'Indexing events from {contract.address}')
+
+        while True:
+            count, caught_up = index_once(w3, contract)
+            if count:
+                self.stdout.write(f'Indexed {count} event(s)')
+            if options['once']:
+                break
+            if caught_up:
+                time.sleep(options['interval'])
@@ -0,0 +1,83 @@
+# Generated by Django 4.2.7 on 2026-10-19 09:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="ChainCursor",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("contract_address", models.CharField(max_length=42, unique=True)),
+                ("block_number", models.PositiveBigIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "db_table": "chain_cursors",
+            },
+        ),
+        migrations.CreateModel(
+            name="ChainEvent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "event_type",
+                    models.CharField(
+                        choices=[
+                            ("file", "File added"),
+                            ("grant", "Access granted"),
+                            ("revoke", "Access revoked"),
+                        ],
+                        max_length=16,
+                    ),
+                ),
+                ("owner", models.CharField(max_length=42)),
+                ("user", models.CharField(blank=True, max_length=42)),
+                ("url", models.CharField(blank=True, max_length=255)),
+                ("block_number", models.PositiveBigIntegerField()),
+                ("tx_hash", models.CharField(max_length=66)),
+                ("log_index", models.PositiveIntegerField()),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "db_table": "chain_events",
+                "ordering": ["id"],
+                "indexes": [
+                    models.Index(
+                        fields=["owner", "id"], name="chain_event_owner_df8c7b_idx"
+                    ),
+                    models.Index(
+                        fields=["user", "id"], name="chain_event_user_3b14b9_idx"
+                    ),
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="chainevent",
+            constraint=models.UniqueConstraint(
+                fields=("tx_hash", "log_index"), name="unique_chain_log"
+            ),
+        ),
+    ]
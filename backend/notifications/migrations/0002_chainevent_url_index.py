@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-19 09:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notifications", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="chainevent",
+            index=models.Index(fields=["url"], name="chain_event_url_3f4cd0_idx"),
+        ),
+    ]
@@ -0,0 +1,61 @@
+from django.db import models
+
+
+class ChainEvent(models.Model):
+    """An Upload contract event picked up by the chain indexer"""
+    TYPE_FILE = 'file'
+    TYPE_GRANT = 'grant'
+    TYPE_REVOKE = 'revoke'
+    TYPE_CHOICES = [
+        (TYPE_FILE, 'File added'),
+        (TYPE_GRANT, 'Access granted'),
+        (TYPE_REVOKE, 'Access revoked'),
+    ]
+
+    event_type = models.CharField(max_length=16, choices=TYPE_CHOICES)
+    owner = models.CharField(max_length=42)  # Lowercase wallet address the event belongs to
+    user = models.CharField(max_length=42, blank=True)  # Grantee for grant/revoke events
+    url = models.CharField(max_length=255, blank=True)
+    block_number = models.PositiveBigIntegerField()
+    tx_hash = models.CharField(max_length=66)
+    log_index = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'chain_events'
+        ordering = ['id']
+        constraints = [
+            models.UniqueConstraint(fields=['tx_hash', 'log_index'], name='unique_chain_log'),
+        ]
+        indexes = [
+            models.Index(fields=['owner', 'id']),
+            models.Index(fields=['user', 'id']),
+            models.Index(fields=['url']),
+        ]
+
+    def __str__(self):
+        return f'{self.event_type} {self.owner} {self.user or self.url}'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'type': self.event_type,
+            'owner': self.owner,
+            'user': self.user or None,
+            'url': self.url or None,
+            'block_number': self.block_number,
+            'tx_hash': self.tx_hash,
+        }
+
+
+class ChainCursor(models.Model):
+    """Last block the indexer has processed for a contract"""
+    contract_address = models.CharField(max_length=42, unique=True)
+    block_number = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'chain_cursors'
+
+    def __str__(self):
+        return f'{self.contract_address} @ {self.block_number}'
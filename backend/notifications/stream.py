@@ -0,0 +1,206 @@
+"""
+Server-Sent Events stream of indexed chain events
+
+Served as a plain ASGI app next to Django so an idle subscriber costs one
+coroutine and one small queue rather than a worker thread. A single poller
+per process reads new ChainEvent rows and fans them out to the subscribers
+watching the owner or grantee address.
+
+    GET /api/events/stream?token=<jwt>&address=<wallet address>
+
+EventSource cannot send headers, so the JWT travels in the query string.
+A reconnecting client's Last-Event-ID header replays what it missed.
+"""
+import asyncio
+import json
+import logging
+import re
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+from authentication.jwt_utils import verify_token
+from .models import ChainEvent
+
+ADDRESS_REGEX = r'^0x[a-fA-F0-9]{40}$'
+
+logger = logging.getLogger(__name__)
+
+
+class Broker:
+    """Fans indexed events out to the queues of subscribed addresses"""
+
+    def __init__(self):
+        self.subscribers = {}
+        self.last_id = None
+        self.task = None
+
+    def subscribe(self, address):
+        queue = asyncio.Queue(maxsize=settings.EVENT_STREAM_QUEUE_SIZE)
+        self.subscribers.setdefault(address, set()).add(queue)
+        if self.task is None or self.task.done():
+            self.task = asyncio.get_running_loop().create_task(self.poll())
+        return queue
+
+    def unsubscribe(self, address, queue):
+        queues = self.subscribers.get(address)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self.subscribers[address]
+
+    async def poll(self):
+        backoff = settings.EVENT_STREAM_POLL_INTERVAL
+        while self.subscribers:
+            try:
+                if self.last_id is None:
+                    self.last_id = await sync_to_async(_latest_id)()
+                events = await sync_to_async(_events_after)(self.last_id, settings.EVENT_STREAM_BATCH_SIZE)
+                for event in events:
+                    self.last_id = event.id
+                    self.publish(event)
+            except Exception:
+                # A database outage must not end the poller while subscribers
+                # stay connected; retry with exponential backoff instead
+                logger.exception("Event stream poll failed, retrying in %ss", backoff)
+                await sync_to_async(close_old_connections)()
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, settings.EVENT_STREAM_MAX_BACKOFF)
+                continue
+
+            backoff = settings.EVENT_STREAM_POLL_INTERVAL
+            if len(events) < settings.EVENT_STREAM_BATCH_SIZE:
+                await asyncio.sleep(settings.EVENT_STREAM_POLL_INTERVAL)
+        # Nobody is listening; the next subscriber starts from the newest event again
+        self.last_id = None
+
+    def publish(self, event):
+        addresses = {event.owner, event.user} - {''}
+        for address in addresses:
+            for queue in list(self.subscribers.get(address, ())):
+                try:
+                    queue.put_nowait(event)
+                except asyncio.QueueFull:
+                    # A subscriber this far behind is closed; it resumes with Last-Event-ID
+                    while not queue.empty():
+                        queue.get_nowait()
+                    queue.put_nowait(None)
+                    self.unsubscribe(address, queue)
+
+
+def _latest_id():
+    latest = ChainEvent.objects.order_by('-id').values_list('id', flat=True).first()
+    return latest or 0
+
+
+def _events_after(last_id, limit, address=None):
+    queryset = ChainEvent.objects.filter(id__gt=last_id)
+    if address is not None:
+        queryset = queryset.filter(owner=address) | queryset.filter(user=address)
+    return list(queryset.order_by('id')[:limit])
+
+
+broker = Broker()
+
+
+def format_event(event):
+    return f'id: {event.id}\nevent: {event.event_type}\ndata: {json.dumps(event.to_dict())}\n\n'.encode('utf-8')
+
+
+async def _send_error(send, status, message, headers):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': headers + [(b'content-type', b'application/json')],
+    })
+    await send({
+        'type': 'http.response.body',
+        'body': json.dumps({'success': False, 'error': message}).encode('utf-8'),
+    })
+
+
+async def stream_app(scope, receive, send):
+    headers = dict(scope['headers'])
+    cors_headers = []
+    origin = headers.get(b'origin', b'').decode('latin-1')
+    if origin in settings.CORS_ALLOWED_ORIGINS:
+        cors_headers = [
+            (b'access-control-allow-origin', origin.encode('latin-1')),
+            (b'access-control-allow-credentials', b'true'),
+            (b'vary', b'Origin'),
+        ]
+
+    if scope['method'] != 'GET':
+        return await _send_error(send, 405, 'Method not allowed', cors_headers)
+
+    query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+    is_valid, payload_or_error = verify_token(query.get('token', [''])[0])
+    if not is_valid:
+        return await _send_error(send, 401, payload_or_error, cors_headers)
+
+    address = query.get('address', [''])[0]
+    if not re.match(ADDRESS_REGEX, address):
+        return await _send_error(send, 400, 'A wallet address is required', cors_headers)
+    address = address.lower()
+
+    queue = broker.subscribe(address)
+    try:
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': cors_headers + [
+                (b'content-type', b'text/event-stream'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+            ],
+        })
+        await send({'type': 'http.response.body', 'body': b': connected\n\n', 'more_body': True})
+
+        last_event_id = headers.get(b'last-event-id', b'').decode('latin-1')
+        if last_event_id.isdigit():
+            missed = await sync_to_async(_events_after)(
+                int(last_event_id), settings.EVENT_STREAM_BATCH_SIZE, address,
+            )
+            sent = max((event.id for event in missed), default=0)
+            for event in missed:
+                await send({'type': 'http.response.body', 'body': format_event(event), 'more_body': True})
+        else:
+            sent = 0
+
+        disconnected = asyncio.ensure_future(_wait_for_disconnect(receive))
+        try:
+            while not disconnected.done():
+                getter = asyncio.ensure_future(queue.get())
+                done, _ = await asyncio.wait(
+                    {getter, disconnected},
+                    timeout=settings.EVENT_STREAM_HEARTBEAT,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if getter not in done:
+                    getter.cancel()
+                    if not done:
+                        await send({'type': 'http.response.body', 'body': b': keepalive\n\n', 'more_body': True})
+                    continue
+
+                event = getter.result()
+                if event is None:
+                    break
+                if event.id > sent:
+                    await send({'type': 'http.response.body', 'body': format_event(event), 'more_body': True})
+        finally:
+            disconnected.cancel()
+
+        await send({'type': 'http.response.body', 'body': b''})
+    except OSError:
+        pass
+    finally:
+        broker.unsubscribe(address, queue)
+
+
+async def _wait_for_disconnect(receive):
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return
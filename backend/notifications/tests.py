@@ -0,0 +1,40 @@
+import asyncio
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase, override_settings
+
+from .models import ChainEvent
+from .stream import Broker
+
+ADDRESS = '0x' + 'a' * 40
+
+
+@override_settings(EVENT_STREAM_POLL_INTERVAL=0.01, EVENT_STREAM_MAX_BACKOFF=0.05)
+class BrokerTests(SimpleTestCase):
+    def test_poller_survives_database_errors(self):
+        event = ChainEvent(id=7, event_type=ChainEvent.TYPE_FILE, owner=ADDRESS, url='ipfs://x')
+        results = [RuntimeError('database went away'), RuntimeError('still away'), [event]]
+
+        def events_after(last_id, limit, address=None):
+            result = results.pop(0) if results else []
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        async def run():
+            broker = Broker()
+            queue = broker.subscribe(ADDRESS)
+            received = await asyncio.wait_for(queue.get(), timeout=5)
+            broker.unsubscribe(ADDRESS, queue)
+            await asyncio.wait_for(broker.task, timeout=5)
+            return received, broker
+
+        with mock.patch('notifications.stream._latest_id', return_value=0), \
+                mock.patch('notifications.stream._events_after', side_effect=events_after):
+            with self.assertLogs('notifications.stream', 'ERROR') as logs:
+                received, broker = async_to_sync(run)()
+
+        self.assertEqual(received.id, 7)
+        self.assertEqual(len(logs.records), 2)
+        self.assertIsNone(broker.last_id)
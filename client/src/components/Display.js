@@ -1,6 +1,8 @@
 import { useState } from "react";
 import "./Display.css";
 
+const API_URL = "http://localhost:8000/api/files";
+
 const Display = ({ contract, account }) => {
   const [data, setData] = useState([]);
   const [loading, setLoading] = useState(false);
@@ -23,7 +25,8 @@ const Display = ({ contract, account }) => {
         const images = str_array.map((item, i) => ({
           id: i,
           url: item,
-          src: `https://gateway.pinata.cloud/ipfs/${item.substring(6)}`,
+          src: `${API_URL}/thumbnails/thumb/${item.substring(6)}`,
+          full: `${API_URL}/ipfs/${item.substring(6)}`,
         }));
       setData(images);
     } else {
@@ -90,7 +93,7 @@ const Display = ({ contract, account }) => {
             style={{ animationDelay: `${index * 100}ms` }}
           >
             <a 
-              href={image.url} 
+              href={image.full} 
               target="_blank" 
               rel="noopener noreferrer"
               className="image-link"
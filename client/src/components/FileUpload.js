@@ -3,6 +3,110 @@ import axios from "axios";
 import imageCompression from "browser-image-compression";
 import "./FileUpload.css";
 
+const API_URL = "http://localhost:8000/api";
+const GATEWAY_URL = `${API_URL}/files/ipfs`;
+const RELAY_POLL_INTERVAL_MS = 2000;
+const RELAY_TIMEOUT_MS = 3 * 60 * 1000;
+
+// Must match relay_message() in backend/files/relayer.py
+const relayMessage = (owner, uris, issuedAt) =>
+  ["BlockShare relay request", `Owner: ${owner.toLowerCase()}`, `Issued at: ${issuedAt}`, "URIs:", ...uris].join("\n");
+
+// Queue URIs with the relayer and wait until every item is confirmed on-chain.
+// The wallet signs the request since the relayer pays for the transaction.
+const relayAdd = async (signer, uris) => {
+  const headers = { Authorization: `Bearer ${localStorage.getItem("userToken")}` };
+  const owner = await signer.getAddress();
+  const issuedAt = Math.floor(Date.now() / 1000);
+  const signature = await signer.signMessage(relayMessage(owner, uris, issuedAt));
+  const res = await axios.post(
+    `${API_URL}/files/relay/`,
+    { owner, uris, issued_at: issuedAt, signature },
+    { headers }
+  );
+  let ids = res.data.items.map((item) => item.id);
+  const deadline = Date.now() + RELAY_TIMEOUT_MS;
+
+  while (ids.length) {
+    if (Date.now() > deadline) {
+      throw new Error(
+        "Timed out waiting for the relayer to confirm the upload. Check that the relayer or job worker is running."
+      );
+    }
+    await new Promise((resolve) => setTimeout(resolve, RELAY_POLL_INTERVAL_MS));
+    const statusRes = await axios.get(`${API_URL}/files/relay/status/`, {
+      headers,
+      params: { ids: ids.join(",") },
+    });
+    const failed = statusRes.data.items.find((item) => item.status === "failed");
+    if (failed) throw new Error(failed.error || "Relayer transaction failed");
+    ids = statusRes.data.items.filter((item) => item.status !== "confirmed").map((item) => item.id);
+  }
+};
+
+const UPLOAD_MAX_RETRIES = 5;
+
+const sha256Hex = async (blob) => {
+  const digest = await crypto.subtle.digest("SHA-256", await blob.arrayBuffer());
+  return Array.from(new Uint8Array(digest), (b) => b.toString(16).padStart(2, "0")).join("");
+};
+
+// Ask the backend whether it already has this content, hashing the whole file only when a cheap
+// prefix hash matches something. Returns the existing cid, or null when the bytes must be sent.
+const findExistingCid = async (file, headers) => {
+  const partialRes = await axios.post(
+    `${API_URL}/files/check/`,
+    { size: file.size, partial_sha256: await sha256Hex(file.slice(0, 64 * 1024)) },
+    { headers }
+  );
+  if (!partialRes.data.candidate) return null;
+
+  const fullRes = await axios.post(
+    `${API_URL}/files/check/`,
+    { size: file.size, sha256: await sha256Hex(file), filename: file.name },
+    { headers }
+  );
+  return fullRes.data.exists ? fullRes.data.cid : null;
+};
+
+// Upload a file in chunks, resuming from the server's offset after a failure
+const uploadInChunks = async (file, onProgress) => {
+  const headers = { Authorization: `Bearer ${localStorage.getItem("userToken")}` };
+  const existingCid = await findExistingCid(file, headers);
+  if (existingCid) {
+    onProgress(100);
+    return existingCid;
+  }
+
+  const res = await axios.post(
+    `${API_URL}/files/uploads/`,
+    { filename: file.name, size: file.size, content_type: file.type },
+    { headers }
+  );
+  const { upload_id: uploadId, chunk_size: chunkSize } = res.data;
+  let { offset, cid } = res.data;
+  let retries = 0;
+
+  while (!cid) {
+    const chunk = file.slice(offset, Math.min(offset + chunkSize, file.size));
+    try {
+      const putRes = await axios.put(`${API_URL}/files/uploads/${uploadId}/`, chunk, {
+        headers: { ...headers, "Content-Type": "application/octet-stream", "Upload-Offset": offset },
+      });
+      ({ offset, cid } = putRes.data);
+      retries = 0;
+    } catch (err) {
+      if ([400, 401, 404, 410].includes(err.response?.status) || retries >= UPLOAD_MAX_RETRIES) throw err;
+      retries += 1;
+      await new Promise((resolve) => setTimeout(resolve, 1000 * retries));
+      const statusRes = await axios.get(`${API_URL}/files/uploads/${uploadId}/`, { headers });
+      ({ offset, cid } = statusRes.data);
+    }
+    if (file.size) onProgress(Math.round((offset * 100) / file.size));
+  }
+  return cid;
+};
+
 const FileUpload = ({ contract, account, onSuccess }) => {
   const [file, setFile] = useState(null);
   const [fileName, setFileName] = useState("No image selected");
@@ -43,12 +147,6 @@ const FileUpload = ({ contract, account, onSuccess }) => {
       return;
     }
 
-    const jwt = process.env.REACT_APP_PINATA_JWT;
-    if (!jwt) {
-      setErrorText("Missing REACT_APP_PINATA_JWT in your .env file.");
-      return;
-    }
-
     try {
       setIsUploading(true);
       setUploadProgress(0);
@@ -67,42 +165,20 @@ const FileUpload = ({ contract, account, onSuccess }) => {
         setErrorText("");
       }
 
-      // ✅ Upload to Pinata V3
-      const formData = new FormData();
-      formData.append("file", uploadFile, uploadFile.name);
-      const metadata = JSON.stringify({
-        name: uploadFile.name,
-        keyvalues: { project: "BlockShare" },
-      });
-      formData.append("metadata", metadata);
-
-      const resFile = await axios.post("https://uploads.pinata.cloud/v3/files", formData, {
-        headers: { Authorization: `Bearer ${jwt}` },
-        maxBodyLength: Infinity,
-        maxContentLength: Infinity,
-        onUploadProgress: (e) => {
-          if (e.total) {
-            const percent = Math.round((e.loaded * 100) / e.total);
-            setUploadProgress(percent);
-          }
-        },
-      });
-
-      const ipfsHash = resFile?.data?.data?.cid;
-      if (!ipfsHash) throw new Error("Pinata response missing cid");
+      // ✅ Stream to the backend in resumable chunks
+      const ipfsHash = await uploadInChunks(uploadFile, setUploadProgress);
+      if (!ipfsHash) throw new Error("Upload response missing cid");
 
       const ipfsUri = `ipfs://${ipfsHash}`;
-      const ipfsGatewayUrl = `https://gateway.pinata.cloud/ipfs/${ipfsHash}`;
+      const ipfsGatewayUrl = `${GATEWAY_URL}/${ipfsHash}`;
 
       console.log("📦 Contract address:", contract.address);
       console.log("🧾 Signer address:", await contract.signer.getAddress());
       console.log("🧾 Account prop:", account);
 
-      // ✅ Call smart contract
+      // ✅ Queue the add with the backend relayer (batched into one addBatch per owner)
       try {
-        const signerAddr = await contract.signer.getAddress();
-        const tx = await contract.add(signerAddr, ipfsUri, { gasLimit: 3000000 });
-        await tx.wait();
+        await relayAdd(contract.signer, [ipfsUri]);
         console.log("✅ File added to contract:", ipfsUri);
       } catch (err) {
         console.error("❌ Contract transaction failed:", err);
@@ -134,14 +210,12 @@ const FileUpload = ({ contract, account, onSuccess }) => {
       if (e.response) {
         const status = e.response.status;
         if (status === 401 || status === 403)
-          setErrorText("Pinata authentication failed. Check your Admin JWT.");
-        else if (status === 404)
-          setErrorText("Pinata endpoint not found. Ensure URL is https://uploads.pinata.cloud/v3/files");
-        else if (status === 413)
-          setErrorText("File too large. Try compressing or upgrade your Pinata plan.");
-        else setErrorText(`Pinata error ${status}: ${e.response.data?.error || "Unknown error"}`);
+          setErrorText("Session expired. Please log in again.");
+        else if (status === 400)
+          setErrorText(e.response.data?.error || "Upload rejected by the server.");
+        else setErrorText(`Upload error ${status}: ${e.response.data?.error || "Unknown error"}`);
       } else if (e.message?.includes("Network Error"))
-        setErrorText("Network error reaching Pinata. Check CORS or internet connection.");
+        setErrorText("Network error reaching the server. Check that the backend is running.");
       else setErrorText(e.message || "Upload failed. Please try again.");
     }
   };
@@ -198,7 +272,7 @@ const FileUpload = ({ contract, account, onSuccess }) => {
           </a>
           <p>
             IPFS CID:{" "}
-            <code>{uploadedCid.replace("https://gateway.pinata.cloud/ipfs/", "")}</code>
+            <code>{uploadedCid.replace(`${GATEWAY_URL}/`, "")}</code>
           </p>
         </div>
       )}
@@ -2,6 +2,15 @@ import { useEffect, useState } from "react";
 import { ethers } from "ethers";
 import "./Modal.css";
 
+const EVENTS_URL = "http://localhost:8000/api/events/stream";
+
+// Apply a grant/revoke event pushed by the backend to the local access list
+const applyAccessEvent = (list, user, hasAccess) => {
+  const index = list.findIndex((item) => (item?.user ?? item?.[0] ?? "").toLowerCase() === user);
+  if (index === -1) return [...list, { user, access: hasAccess }];
+  return list.map((item, i) => (i === index ? { user: item?.user ?? item?.[0], access: hasAccess } : item));
+};
+
 const Modal = ({ setModalOpen, contract }) => {
   const [isSharing, setIsSharing] = useState(false);
   const [shareStatus, setShareStatus] = useState(null);
@@ -49,10 +58,6 @@ const Modal = ({ setModalOpen, contract }) => {
 
       setShareStatus({ type: 'success', message: 'Access granted successfully!' });
 
-      // Update access list
-      const newList = await contract.shareAccess();
-      setAccessList(newList);
-
       // Clear input
       setAddress("");
 
@@ -85,6 +90,33 @@ const Modal = ({ setModalOpen, contract }) => {
     }
   }, [contract]);
 
+  // Receive grant/revoke events as they are indexed instead of re-reading shareAccess
+  useEffect(() => {
+    const token = localStorage.getItem('userToken');
+    if (!contract || !token) return undefined;
+
+    let source;
+    let cancelled = false;
+    const subscribe = async () => {
+      const owner = (await contract.signer.getAddress()).toLowerCase();
+      if (cancelled) return;
+      source = new EventSource(`${EVENTS_URL}?token=${encodeURIComponent(token)}&address=${owner}`);
+      const onAccessEvent = (hasAccess) => (e) => {
+        const event = JSON.parse(e.data);
+        if (event.owner !== owner) return;
+        setAccessList((list) => applyAccessEvent(list, event.user, hasAccess));
+      };
+      source.addEventListener('grant', onAccessEvent(true));
+      source.addEventListener('revoke', onAccessEvent(false));
+    };
+
+    subscribe().catch((error) => console.error('Failed to subscribe to access events:', error));
+    return () => {
+      cancelled = true;
+      if (source) source.close();
+    };
+  }, [contract]);
+
   // Handle escape key
   useEffect(() => {
     const handleEscape = (e) => {
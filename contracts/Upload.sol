@@ -13,8 +13,19 @@ contract Upload {
   mapping(address=>Access[]) accessList;
   mapping(address=>mapping(address=>bool)) previousData;
 
+  event FileAdded(address indexed user,string url);
+  event AccessGranted(address indexed owner,address indexed user);
+  event AccessRevoked(address indexed owner,address indexed user);
+
   function add(address _user,string memory url) external {
       value[_user].push(url);
+      emit FileAdded(_user,url);
+  }
+  function addBatch(address _user,string[] memory urls) external {
+      for(uint i=0;i<urls.length;i++){
+          value[_user].push(urls[i]);
+          emit FileAdded(_user,urls[i]);
+      }
   }
   function allow(address user) external {//def
       ownership[msg.sender][user]=true; 
@@ -28,6 +39,7 @@ contract Upload {
           accessList[msg.sender].push(Access(user,true));  
           previousData[msg.sender][user]=true;  
       }
+      emit AccessGranted(msg.sender,user);
     
   }
   function disallow(address user) public{
@@ -37,6 +49,7 @@ contract Upload {
               accessList[msg.sender][i].access=false;  
           }
       }
+      emit AccessRevoked(msg.sender,user);
   }
 
   function display(address _user) external view returns(string[] memory){
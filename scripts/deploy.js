@@ -21,6 +21,7 @@ async function main() {
 
   fs.writeFileSync(envPath, envContent);
   console.log(`📝 Updated client/.env with contract address: ${upload.address}`);
+  console.log(`ℹ️  Set RELAYER_CONTRACT_ADDRESS=${upload.address} in backend/.env for the upload relayer`);
 }
 
 main().catch((error) => {
@@ -0,0 +1,60 @@
+const { expect } = require("chai");
+const { ethers } = require("hardhat");
+
+describe("Upload", function () {
+  let upload, owner, viewer, relayer;
+
+  beforeEach(async function () {
+    [relayer, owner, viewer] = await ethers.getSigners();
+    const Upload = await ethers.getContractFactory("Upload");
+    upload = await Upload.deploy();
+    await upload.deployed();
+  });
+
+  describe("addBatch", function () {
+    it("appends every URI to the owner's list in order", async function () {
+      const uris = ["ipfs://one", "ipfs://two", "ipfs://three"];
+      await upload.connect(relayer).addBatch(owner.address, uris);
+
+      expect(await upload.connect(owner).display(owner.address)).to.deep.equal(uris);
+    });
+
+    it("emits FileAdded for each URI", async function () {
+      await expect(upload.connect(relayer).addBatch(owner.address, ["ipfs://one", "ipfs://two"]))
+        .to.emit(upload, "FileAdded")
+        .withArgs(owner.address, "ipfs://one")
+        .and.to.emit(upload, "FileAdded")
+        .withArgs(owner.address, "ipfs://two");
+    });
+
+    it("appends after files added one at a time", async function () {
+      await upload.connect(owner).add(owner.address, "ipfs://first");
+      await upload.connect(relayer).addBatch(owner.address, ["ipfs://second"]);
+
+      expect(await upload.connect(owner).display(owner.address)).to.deep.equal([
+        "ipfs://first",
+        "ipfs://second",
+      ]);
+    });
+
+    it("accepts an empty batch", async function () {
+      await expect(upload.addBatch(owner.address, [])).not.to.emit(upload, "FileAdded");
+      expect(await upload.connect(owner).display(owner.address)).to.deep.equal([]);
+    });
+  });
+
+  describe("access events", function () {
+    it("emits AccessGranted and AccessRevoked", async function () {
+      await expect(upload.connect(owner).allow(viewer.address))
+        .to.emit(upload, "AccessGranted")
+        .withArgs(owner.address, viewer.address);
+      await upload.connect(relayer).addBatch(owner.address, ["ipfs://shared"]);
+      expect(await upload.connect(viewer).display(owner.address)).to.deep.equal(["ipfs://shared"]);
+
+      await expect(upload.connect(owner).disallow(viewer.address))
+        .to.emit(upload, "AccessRevoked")
+        .withArgs(owner.address, viewer.address);
+      await expect(upload.connect(viewer).display(owner.address)).to.be.revertedWith("You don't have access");
+    });
+  });
+});